@@ -0,0 +1,6 @@
+"""Benchmarks for the navigator.
+
+- ``python -m benchmarks.run``: timings of the data paths on synthetic campuses.
+- ``python -m benchmarks.reruns``: cost and budgets of each rerun of ``app.py``.
+- ``python -m benchmarks.load``: concurrent sessions against a live server.
+"""
@@ -0,0 +1,484 @@
+"""Load test: many concurrent browser sessions against one Streamlit server.
+
+Starts ``streamlit run app.py`` on a free port and connects simulated
+sessions over the same websocket protocol the browser uses. Each session
+loads the page, fetches the navigator page as the iframe would, then replays
+a mix of navigations and settings changes with random think times. The
+report gives, per concurrency level, the script runs per second, the latency
+from a widget change to the end of its script run, the bytes sent to each
+session, and the server's CPU time and resident memory, as a total and per
+session.
+
+    python -m benchmarks.load --sessions 100,300,1000 --output load.json
+
+Every level gets a fresh server, so sessions kept for reconnection by one
+level do not count towards the next. Levels stop once one misses ``--slo-ms``
+at p99 or has errors; the last level run is where the server tips over.
+
+The size of one session's ``nav_history`` at capacity and of the compiled
+navigator page and assets are reported next to the measurements. The page is
+compiled once per process and served from disk, so it does not grow with
+sessions. Sessions fetch it as first visits, assets included.
+
+The simulated sessions run in this process, on the same machine as the
+server; on a small machine they take CPU from it, so treat the numbers as a
+lower bound of what the server alone can take.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict, deque
+from pathlib import Path
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from navigator.history import HISTORY_CAPACITY, NavigationHistory, Visit
+from navigator.registry import load_registry
+from navigator.shell import COMPONENT_NAME
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = ROOT / "app.py"
+
+DEFAULT_LEVELS = (50, 200)
+DEFAULT_SLO_MS = 2000.0
+
+# Relative frequency of each interaction after the first load
+TRAFFIC = {
+    "navigate": 50,
+    "travel_mode": 15,
+    "voice_rate": 15,
+    "voice_toggle": 10,
+    "clear_history": 5,
+    "refresh": 5,
+}
+
+TRAVEL_MODES = ("Auto (distance-based)", "Walking", "Driving")
+
+_DONE = {
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+}
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def deep_size(obj, seen: set | None = None) -> int:
+    """Bytes held by ``obj`` and everything it references, shared objects once."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+def history_bytes_at_capacity() -> int:
+    """Size of a session's ``nav_history`` holding ``HISTORY_CAPACITY`` visits.
+
+    The store is shared by every session and left out.
+    """
+    registry = load_registry()
+    places = registry.places
+    history = NavigationHistory()
+    for i in range(HISTORY_CAPACITY):
+        place = places[i % len(places)]
+        history.append(Visit(place.id, place.name, time.strftime("%I:%M:%S %p"), 0.1234 * i, "walking"))
+    history.last_event_id = "nav-0123456789"
+    history.session = "0" * 32
+    return deep_size(history)
+
+
+# --- server ------------------------------------------------------------------
+
+
+class Server:
+    """``streamlit run app.py`` in a subprocess, with its history and builds in ``workdir``."""
+
+    def __init__(self, workdir: Path, port: int) -> None:
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        env = dict(
+            os.environ,
+            NAVIGATOR_HISTORY_DB=str(workdir / "history.sqlite3"),
+            NAVIGATOR_BUILD_DIR=str(workdir / "frontend"),
+            NAVIGATOR_DATASET_DIR=str(workdir / "datasets"),
+        )
+        self._log = open(workdir / f"server-{port}.log", "wb")
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", str(APP_PATH),
+                "--server.port", str(port),
+                "--server.headless", "true",
+                "--server.fileWatcherType", "none",
+                "--browser.gatherUsageStats", "false",
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+
+    def wait_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server exited with {self.process.returncode}; see {self._log.name}")
+            try:
+                with urllib.request.urlopen(f"{self.url}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                time.sleep(0.2)
+        raise TimeoutError(f"server not ready after {timeout:.0f} s; see {self._log.name}")
+
+    def rss_bytes(self) -> int:
+        with open(f"/proc/{self.process.pid}/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.process.pid}/stat", encoding="ascii") as stat:
+            fields = stat.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self._log.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- sessions ----------------------------------------------------------------
+
+
+class Session:
+    """One simulated browser tab.
+
+    Like the browser, it resends the value of every widget on each rerun,
+    plus the trigger of the button that was clicked, and reruns only the
+    fragment of a button drawn by a fragment.
+    """
+
+    def __init__(self, server: Server, place_ids: list[str], rng: random.Random, timeout: float) -> None:
+        self.server = server
+        self.place_ids = place_ids
+        self.rng = rng
+        self.timeout = timeout
+        self.query_string = ""
+        self.widgets: dict[str, str] = {}  # label -> widget id
+        self.fragments: dict[str, str] = {}  # widget id -> id of the fragment drawing it
+        self.values: dict[str, WidgetState] = {}  # widget id -> last value sent
+        self.component_id: str | None = None
+        self.voice_enabled = True
+        self.events = 0
+        self.bytes_received = 0
+        self.ws = None
+
+    async def run_script(self, trigger: str | None = None):
+        """Request a rerun and wait for it to finish; return (ms, bytes, error)."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query_string
+        msg.rerun_script.widget_states.widgets.extend(self.values.values())
+        if trigger is not None:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = trigger
+            state.trigger_value = True
+            msg.rerun_script.fragment_id = self.fragments.get(trigger, "")
+
+        started = time.perf_counter()
+        received = 0
+        error = None
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            data = await asyncio.wait_for(self.ws.recv(), self.timeout)
+            received += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                error = self._element(forward.delta.new_element, forward.delta.fragment_id) or error
+            elif kind == "page_info_changed":
+                self.query_string = forward.page_info_changed.query_string
+            elif kind == "script_finished" and forward.script_finished in _DONE:
+                break
+        self.bytes_received += received
+        return (time.perf_counter() - started) * 1000.0, received, error
+
+    def _element(self, element, fragment_id: str) -> str | None:
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            return element.exception.message or element.exception.type
+        if kind == "component_instance" and element.component_instance.component_name == COMPONENT_NAME:
+            self.component_id = element.component_instance.id
+        elif kind in ("radio", "checkbox", "slider", "button"):
+            widget = getattr(element, kind)
+            self.widgets[widget.label] = widget.id
+            self.fragments[widget.id] = fragment_id
+        return None
+
+    def _widget(self, label: str) -> str:
+        for widget_label, widget_id in self.widgets.items():
+            if label in widget_label:
+                return widget_id
+        raise KeyError(f"no widget labelled {label!r}")
+
+    def _set(self, widget_id: str, field: str, value) -> None:
+        state = self.values.setdefault(widget_id, WidgetState(id=widget_id))
+        if field == "double_array_value":
+            state.double_array_value.data[:] = value
+        else:
+            setattr(state, field, value)
+
+    async def act(self, action: str):
+        trigger = None
+        if action == "navigate":
+            # The event the page sends after a tap, see reportNavigation
+            self.events += 1
+            event = {
+                "id": f"load-{id(self):x}-{self.events}",
+                "type": "navigate",
+                "place": self.rng.choice(self.place_ids),
+                "distance_km": round(self.rng.uniform(0.05, 2.5), 4),
+                "mode": self.rng.choice(("walking", "driving")),
+                "time": time.strftime("%I:%M:%S %p"),
+            }
+            self._set(self.component_id, "json_value", json.dumps(event))
+        elif action == "travel_mode":
+            self._set(self._widget("Travel Mode"), "string_value", self.rng.choice(TRAVEL_MODES))
+            trigger = self._widget("Apply Settings")
+        elif action == "voice_rate":
+            self._set(self._widget("Voice Speed"), "double_array_value", [self.rng.randrange(5, 21) / 10])
+            trigger = self._widget("Apply Settings")
+        elif action == "voice_toggle":
+            self.voice_enabled = not self.voice_enabled
+            self._set(self._widget("Enable Voice"), "bool_value", self.voice_enabled)
+            trigger = self._widget("Apply Settings")
+        elif action == "clear_history":
+            trigger = self._widget("Clear History")
+        elif action == "refresh":
+            trigger = self._widget("Refresh App")
+        return await self.run_script(trigger)
+
+
+async def _fetch_page(server: Server) -> int:
+    """Load the navigator page and its assets, as a first visit would."""
+
+    def fetch(path: str) -> bytes:
+        with urllib.request.urlopen(f"{server.url}/component/{COMPONENT_NAME}/{path}") as response:
+            return response.read()
+
+    stub = await asyncio.to_thread(fetch, "index.html")
+    # Script and stylesheet, plus the engine and the places the script loads
+    # on a first visit
+    assets = re.findall(r'(?:src|href|data-worker|data-places)="([^"]+)"', stub.decode("utf-8"))
+    return len(stub) + sum([len(await asyncio.to_thread(fetch, asset)) for asset in assets])
+
+
+async def run_session(server, place_ids, seed, delay, actions, think, timeout, record, connected) -> None:
+    rng = random.Random(seed)
+    await asyncio.sleep(delay)
+    session = Session(server, place_ids, rng, timeout)
+    try:
+        async with websockets.connect(
+            f"ws://127.0.0.1:{server.port}/_stcore/stream",
+            subprotocols=["streamlit"],
+            max_size=None,
+            open_timeout=timeout,
+        ) as ws:
+            session.ws = ws
+            record("first_load", *await session.run_script())
+            record("component_page", 0.0, await _fetch_page(server), None)
+            connected.append(session)
+            for _ in range(actions):
+                await asyncio.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+                action = rng.choices(list(TRAFFIC), weights=list(TRAFFIC.values()))[0]
+                record(action, *await session.act(action))
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException, KeyError) as exc:
+        record("session", None, 0, f"{type(exc).__name__}: {exc}")
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(values[min(len(values) - 1, int(q * len(values)))], 2)
+
+    return {
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(values[-1], 2),
+        "mean_ms": round(statistics.fmean(values), 2),
+    }
+
+
+async def _sample_rss(server: Server, samples: list[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        samples.append(server.rss_bytes())
+        try:
+            await asyncio.wait_for(stop.wait(), 0.25)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_level(server, sessions, actions, think, ramp, timeout, seed) -> dict:
+    """Run ``sessions`` concurrent sessions against a warmed-up server."""
+    place_ids = [place.id for place in load_registry()]
+    latencies = defaultdict(list)
+    bytes_by_action = defaultdict(int)
+    errors = []
+    connected = []
+
+    def record(action, ms, size, error):
+        if error is not None:
+            errors.append(f"{action}: {error}")
+        if ms is not None and action != "component_page":
+            latencies[action].append(ms)
+        bytes_by_action[action] += size
+
+    # One session first, so process-wide caches are built before the baseline
+    await run_session(server, place_ids, seed, 0, 0, 0, timeout, lambda *a: None, [])
+    rss_before = server.rss_bytes()
+    cpu_before = server.cpu_seconds()
+
+    rss_samples = [rss_before]
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_rss(server, rss_samples, stop))
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_session(
+                server, place_ids, seed + i, ramp * i / sessions, actions, think, timeout, record, connected
+            )
+            for i in range(sessions)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    runs = [ms for values in latencies.values() for ms in values]
+    peak = max(rss_samples)
+    return {
+        "sessions": sessions,
+        "connected": len(connected),
+        "elapsed_s": round(elapsed, 2),
+        "script_runs": len(runs),
+        "runs_per_s": round(len(runs) / elapsed, 2),
+        "latency": _percentiles(runs),
+        "latency_by_action": {action: _percentiles(values) for action, values in sorted(latencies.items())},
+        "runs_by_action": {action: len(values) for action, values in sorted(latencies.items())},
+        "bytes_per_run": round(sum(v for k, v in bytes_by_action.items() if k != "component_page") / max(1, len(runs))),
+        "component_page_bytes_sent": bytes_by_action["component_page"],
+        "server_cpu_s": round(server.cpu_seconds() - cpu_before, 2),
+        "rss_before_mib": round(rss_before / 2**20, 1),
+        "rss_peak_mib": round(peak / 2**20, 1),
+        "rss_per_session_kib": round((peak - rss_before) / 1024 / max(1, len(connected)), 1),
+        "errors": len(errors),
+        "error_samples": errors[:10],
+    }
+
+
+def run(levels, actions: int, think: float, ramp: float, timeout: float, slo_ms: float, seed: int) -> dict:
+    """Run each concurrency level on a fresh server until one is saturated."""
+    report = {
+        "meta": {
+            "actions_per_session": actions,
+            "think_s": think,
+            "ramp_s": ramp,
+            "slo_p99_ms": slo_ms,
+            "traffic": TRAFFIC,
+            "seed": seed,
+        },
+        "history_bytes_at_capacity": history_bytes_at_capacity(),
+        "levels": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="navigator-load-") as workdir:
+        for sessions in levels:
+            server = Server(Path(workdir), free_port())
+            try:
+                server.wait_ready()
+                result = asyncio.run(run_level(server, sessions, actions, think, ramp, timeout, seed))
+            finally:
+                server.stop()
+            page = next((Path(workdir) / "frontend").glob("*/index.html"), None)
+            report["component_page_bytes"] = _build_size(page.parent) if page else None
+
+            p99 = result["latency"].get("p99_ms", float("inf"))
+            result["saturated"] = bool(result["errors"]) or p99 > slo_ms
+            report["levels"].append(result)
+            print(
+                f"{sessions:>6} sessions  {result['runs_per_s']:>8.1f} runs/s  "
+                f"p50 {result['latency'].get('p50_ms', 0):>8.1f} ms  p99 {p99:>8.1f} ms  "
+                f"{result['rss_per_session_kib']:>7.1f} KiB/session  {result['errors']} errors",
+                file=sys.stderr,
+            )
+            if result["saturated"]:
+                break
+    return report
+
+
+def _build_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def _levels(text: str) -> list[int]:
+    return [int(part) for part in text.split(",") if part]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=_levels, default=list(DEFAULT_LEVELS), help="comma-separated concurrency levels")
+    parser.add_argument("--actions", type=int, default=10, help="interactions per session after the first load")
+    parser.add_argument("--think", type=float, default=2.0, help="mean seconds between a session's interactions")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which sessions connect")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed per script run")
+    parser.add_argument("--slo-ms", type=float, default=DEFAULT_SLO_MS, help="p99 latency above which a level is saturated")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.sessions, args.actions, args.think, args.ramp, args.timeout, args.slo_ms, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
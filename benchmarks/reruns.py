@@ -0,0 +1,220 @@
+"""Rerun cost of ``app.py``, end to end.
+
+Drives the app headlessly with ``streamlit.testing.v1.AppTest`` through the
+interactions users repeat all day: first load, applying a new travel mode,
+voice speed or voice toggle, a navigation landing in the history
+and clearing it. For every script run it records the wall time, the number
+of elements and the bytes of element protos sent to the browser, with the
+navigator component's share reported separately. Each step has a budget, and
+the run exits 1 when a median exceeds one.
+
+    python -m benchmarks.reruns [--repeat 5] [--output reruns.json]
+    python -m benchmarks.reruns --budgets my-budgets.json
+
+The navigator page itself is served over HTTP once per page load, not per
+rerun; the size of its stub and assets is reported as ``component_page_bytes``.
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+# Keep history and builds of the harness out of the working tree; set before
+# the navigator modules read them
+_WORKDIR = tempfile.mkdtemp(prefix="navigator-reruns-")
+atexit.register(shutil.rmtree, _WORKDIR, True)
+os.environ.setdefault("NAVIGATOR_HISTORY_DB", str(Path(_WORKDIR) / "history.sqlite3"))
+os.environ.setdefault("NAVIGATOR_BUILD_DIR", str(Path(_WORKDIR) / "frontend"))
+os.environ.setdefault("NAVIGATOR_DATASET_DIR", str(Path(_WORKDIR) / "datasets"))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from navigator.registry import load_registry  # noqa: E402
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+COMPONENT_KEY = "navigator"
+
+# Per-step ceilings on the median wall time, elements and element bytes
+DEFAULT_BUDGETS = {
+    "first_load": {"wall_ms": 1000.0, "elements": 40, "payload_bytes": 3000},
+    "travel_mode": {"wall_ms": 150.0, "elements": 40, "payload_bytes": 3000},
+    "voice_rate": {"wall_ms": 150.0, "elements": 40, "payload_bytes": 3000},
+    "voice_toggle": {"wall_ms": 150.0, "elements": 40, "payload_bytes": 3000},
+    "navigation": {"wall_ms": 150.0, "elements": 40, "payload_bytes": 3000},
+    "clear_history": {"wall_ms": 150.0, "elements": 40, "payload_bytes": 3000},
+}
+
+
+class Step(NamedTuple):
+    """One user interaction and the script runs it triggers."""
+
+    name: str
+    act: Callable[[AppTest], AppTest]
+
+
+def _navigate(at: AppTest) -> AppTest:
+    # AppTest cannot set a component value, so record the event the
+    # component would have sent, as the on_change callback does
+    history = at.session_state.nav_history
+    history.record_event(
+        {
+            "id": f"bench-{time.monotonic_ns()}",
+            "type": "navigate",
+            "place": "central-library",
+            "distance_km": 0.42,
+            "mode": "walking",
+            "time": "10:00:00",
+        },
+        load_registry(),
+    )
+    return at.run()
+
+
+def _button(at: AppTest, label: str):
+    return next(b for b in at.sidebar.button if label in b.label)
+
+
+def _apply_settings(change: Callable[[AppTest], object]) -> Callable[[AppTest], AppTest]:
+    # Settings live in a form and only reach the script with its submit button
+    def act(at: AppTest) -> AppTest:
+        change(at)
+        return _button(at, "Apply Settings").click().run()
+
+    return act
+
+
+def _clear_history(at: AppTest) -> AppTest:
+    # The history panel is a fragment, but AppTest reruns the whole script
+    return _button(at, "Clear History").click().run()
+
+
+SESSION = (
+    Step("first_load", lambda at: at.run()),
+    Step("travel_mode", _apply_settings(lambda at: at.sidebar.radio[0].set_value("Walking"))),
+    Step("voice_rate", _apply_settings(lambda at: at.sidebar.slider[0].set_value(1.5))),
+    Step("voice_toggle", _apply_settings(lambda at: at.sidebar.checkbox[0].uncheck())),
+    Step("navigation", _navigate),
+    Step("clear_history", _clear_history),
+)
+
+
+def _nodes(node):
+    yield node
+    children = getattr(node, "children", None)
+    if isinstance(children, dict):
+        for child in children.values():
+            yield from _nodes(child)
+
+
+def snapshot(at: AppTest) -> dict:
+    """Element count and proto bytes of the current element tree."""
+    elements = 0
+    payload = 0
+    component = 0
+    for node in _nodes(at._tree):
+        proto = getattr(node, "proto", None)
+        if proto is None:
+            continue
+        elements += 1
+        size = proto.ByteSize()
+        payload += size
+        if getattr(node, "key", None) == COMPONENT_KEY:
+            component += size
+    return {"elements": elements, "payload_bytes": payload, "component_bytes": component}
+
+
+def run_session(timeout: float) -> dict:
+    """Play one session and return the measurements of each step."""
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    results = {}
+    for step in SESSION:
+        started = time.perf_counter()
+        at = step.act(at)
+        wall_ms = (time.perf_counter() - started) * 1000.0
+        if at.exception:
+            raise RuntimeError(f"{step.name}: {at.exception[0].message}")
+        results[step.name] = {"wall_ms": wall_ms, **snapshot(at)}
+    return results
+
+
+def run(repeat: int, timeout: float) -> dict:
+    """Play ``repeat`` sessions and summarize each step."""
+    sessions = [run_session(timeout) for _ in range(repeat)]
+    steps = {}
+    for step in SESSION:
+        runs = [session[step.name] for session in sessions]
+        walls = sorted(r["wall_ms"] for r in runs)
+        steps[step.name] = {
+            "wall_ms_p50": round(statistics.median(walls), 2),
+            "wall_ms_max": round(walls[-1], 2),
+            # Deterministic for a given app; the last session is representative
+            "elements": runs[-1]["elements"],
+            "payload_bytes": runs[-1]["payload_bytes"],
+            "component_bytes": runs[-1]["component_bytes"],
+        }
+
+    page = next(Path(os.environ["NAVIGATOR_BUILD_DIR"]).glob("*/index.html"), None)
+    return {
+        "repeat": repeat,
+        "component_page_bytes": sum(f.stat().st_size for f in page.parent.rglob("*") if f.is_file()) if page else None,
+        "steps": steps,
+    }
+
+
+def check(report: dict, budgets: dict) -> list[str]:
+    """Return a line per exceeded budget."""
+    failures = []
+    for name, limits in budgets.items():
+        step = report["steps"].get(name)
+        if step is None:
+            continue
+        measured = {
+            "wall_ms": step["wall_ms_p50"],
+            "elements": step["elements"],
+            "payload_bytes": step["payload_bytes"],
+        }
+        for metric, limit in limits.items():
+            if measured[metric] > limit:
+                failures.append(f"{name} {metric}: {measured[metric]} > {limit}")
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure and budget reruns of app.py.")
+    parser.add_argument("--repeat", type=int, default=5, help="sessions to play")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds allowed per script run")
+    parser.add_argument("--budgets", type=Path, help="JSON file overriding some of the default budgets")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    budgets = {name: dict(limits) for name, limits in DEFAULT_BUDGETS.items()}
+    if args.budgets:
+        for name, limits in json.loads(args.budgets.read_text(encoding="utf-8")).items():
+            budgets.setdefault(name, {}).update(limits)
+
+    report = run(args.repeat, args.timeout)
+    report["budgets"] = budgets
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    failures = check(report, budgets)
+    for line in failures:
+        print(f"OVER BUDGET {line}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
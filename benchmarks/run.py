@@ -0,0 +1,299 @@
+"""Time the navigator's core operations on synthetic campuses.
+
+Each case is timed per call after a warm-up, at every requested scale, and
+reported as JSON with percentiles in microseconds. With ``--baseline`` the
+medians are compared against a stored report and the run fails when any case
+is slower by more than ``--threshold``.
+
+    python -m benchmarks.run --scales 1,10,100 --output bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline
+
+Every case is measured ``--rounds`` times and the fastest round kept, and
+medians are compared after scaling by a calibration workload timed next to
+them, so a busy or uniformly slower machine is not reported as a regression.
+
+A scale of ``s`` generates ``15 * s`` places, the size of the real registry
+times ``s``.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from benchmarks.synthetic import generate_campus, random_points, search_queries
+from navigator.distance import DistanceEngine
+from navigator.registry import LocationRegistry, diff_registries
+from navigator.route_cache import load_route_table
+from navigator.routing import Router
+from navigator.search import SearchIndex
+from navigator.shell import compile_shell
+from navigator.spatial import SpatialIndex
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+BASE_PLACES = 15
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_THRESHOLD = 0.25
+# Differences below this many microseconds are treated as noise
+NOISE_FLOOR_US = 5.0
+# Route tables are only built when places x nodes stays below this
+MAX_TABLE_CELLS = 2_000_000
+
+PERCENTILES = (50, 90, 99)
+
+
+class Case(NamedTuple):
+    """A timed operation. ``setup`` runs untimed before each call of ``run``."""
+
+    name: str
+    run: Callable
+    setup: Callable | None = None
+    repeat: int | None = None
+
+
+def measure(case: Case, repeat: int, warmup: int) -> dict:
+    """Time ``case.run`` once per sample and summarize in microseconds."""
+    repeat = case.repeat or repeat
+    samples = np.empty(repeat)
+    for i in range(-min(warmup, repeat), repeat):
+        arg = case.setup() if case.setup else None
+        start = time.perf_counter_ns()
+        case.run(arg)
+        elapsed = time.perf_counter_ns() - start
+        if i >= 0:
+            samples[i] = elapsed / 1000.0
+    summary = {f"p{p}_us": round(float(np.percentile(samples, p)), 2) for p in PERCENTILES}
+    summary.update(
+        mean_us=round(float(samples.mean()), 2),
+        min_us=round(float(samples.min()), 2),
+        max_us=round(float(samples.max()), 2),
+        samples=repeat,
+    )
+    return summary
+
+
+def best_of(case: Case, repeat: int, warmup: int, rounds: int) -> dict:
+    """Measure ``rounds`` times and keep the summary with the lowest median.
+
+    Interference from other processes only ever adds time, so the fastest
+    round is the most repeatable estimate.
+    """
+    return min((measure(case, repeat, warmup) for _ in range(rounds)), key=lambda summary: summary["p50_us"])
+
+
+def calibrate(repeat: int = 50, rounds: int = 1) -> float:
+    """Median microseconds of a fixed pure-Python workload.
+
+    Timed next to each scale's cases; reports from machines, or moments, of
+    different speed are compared after scaling by the ratio of these times.
+    """
+    data = [(i * 7919) % 10007 for i in range(2000)]
+
+    def workload(_=None):
+        table = {}
+        for value in sorted(data):
+            table[str(value)] = value * 0.5
+        return sum(table.values())
+
+    return best_of(Case("calibration", workload), repeat, 5, rounds)["p50_us"]
+
+
+def _cycle(values: list):
+    state = {"i": -1}
+
+    def next_value(_=None):
+        state["i"] = (state["i"] + 1) % len(values)
+        return values[state["i"]]
+
+    return next_value
+
+
+def build_cases(n_places: int, seed: int, workdir: Path) -> tuple[dict, list[Case]]:
+    """Generate a campus and the cases that run against it."""
+    campus = generate_campus(n_places, seed=seed)
+    registry, graph = campus.registry, campus.graph
+    points = random_points(registry, 256, seed=seed)
+    queries = search_queries(registry, 256, seed=seed)
+    rng = random.Random(seed)
+    place_ids = [p.id for p in registry]
+    # Large one-off builds get fewer samples
+    heavy = max(3, min(50, 20_000 // n_places))
+
+    search = SearchIndex(registry)
+    engine = DistanceEngine(registry)
+    spatial = SpatialIndex(registry)
+    router = Router(graph, registry)
+    next_point = _cycle(points)
+    next_query = _cycle(queries)
+    trips = [
+        (rng.randrange(len(graph)), router.destination_node(rng.choice(place_ids)), rng.choice(("walking", "driving")))
+        for _ in range(64)
+    ]
+    next_trip = _cycle(trips)
+    routed = [(lat, lng, rng.choice(place_ids)) for lat, lng in points[:32]]
+    next_routed = _cycle(routed)
+
+    def fresh_registry(_=None):
+        return LocationRegistry(registry.categories, registry.places)
+
+    # An edit to the locations file (every 50th place moved, one renamed,
+    # one added, one removed) and its undo, applied in turn to live indexes
+    edited_places = [
+        place._replace(lat=place.lat + 1e-4) if i % 50 == 0 else place for i, place in enumerate(registry.places)
+    ]
+    edited_places[1] = edited_places[1]._replace(name=edited_places[1].name + " Annex")
+    edited_places[-1] = edited_places[0]._replace(id="bench-popup", name="Pop-up Help Desk")
+    edited = LocationRegistry(registry.categories, edited_places)
+    live = [SearchIndex(registry), SpatialIndex(registry), DistanceEngine(registry)]
+    live[2].matrix()
+    next_edit = _cycle([(diff_registries(registry, edited), edited), (diff_registries(edited, registry), registry)])
+
+    def apply_edit(edit):
+        for index in live:
+            index.apply_changes(*edit)
+
+    cases = [
+        Case("registry_build", fresh_registry, repeat=heavy),
+        Case("registry_serialize", lambda r: (r.version, r.client_json), setup=fresh_registry, repeat=heavy),
+        Case("search_index_build", lambda _: SearchIndex(registry), repeat=heavy),
+        Case("shell_compile", lambda _: compile_shell(registry), repeat=heavy),
+        Case("search_query", lambda q: search.search(q), setup=next_query),
+        Case("etas_batch", lambda p: engine.etas_from(*p), setup=next_point),
+        Case("nearest_5", lambda p: spatial.nearest(*p, n=5), setup=next_point),
+        Case("route_astar", lambda t: graph.astar(*t), setup=next_trip),
+        Case("route_cached", lambda r: router.route(*r), setup=next_routed),
+        Case("registry_apply_changes", apply_edit, setup=next_edit),
+    ]
+
+    destinations = {place_id: router.destination_node(place_id) for place_id in place_ids}
+    if len(destinations) * len(graph) <= MAX_TABLE_CELLS:
+        table_dir = workdir / f"routes-{n_places}"
+        started = time.perf_counter()
+        table = load_route_table(graph, destinations, cache_dir=table_dir)
+        build_s = time.perf_counter() - started
+        table_router = Router(graph, registry, table=table)
+        cases.append(
+            Case("route_table_lookup", lambda r: (table_router.clear(), table_router.route(*r)), setup=next_routed)
+        )
+    else:
+        build_s = None
+
+    info = {
+        "places": len(registry),
+        "categories": len(registry.categories),
+        "nodes": len(graph),
+        "route_table_build_s": None if build_s is None else round(build_s, 3),
+    }
+    return info, cases
+
+
+def run(
+    scales, repeat: int, warmup: int, seed: int, rounds: int = 1, only: set[str] | None = None
+) -> dict:
+    """Run every case at every scale and return the report."""
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "rounds": rounds,
+            "seed": seed,
+        },
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="navigator-bench-") as workdir:
+        for scale in scales:
+            n_places = BASE_PLACES * scale
+            print(f"scale {scale}: {n_places} places", file=sys.stderr)
+            info, cases = build_cases(n_places, seed, Path(workdir))
+            info["calibration_us"] = calibrate(rounds=rounds)
+            results = {}
+            for case in cases:
+                if only and case.name not in only:
+                    continue
+                results[case.name] = best_of(case, repeat, warmup, rounds)
+                print(f"  {case.name:<20} p50 {results[case.name]['p50_us']:>12.2f} us", file=sys.stderr)
+            report["scales"][str(scale)] = {**info, "cases": results}
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return a line per case whose median regressed beyond ``threshold``.
+
+    Baseline times are first scaled by the calibration ratio of the two runs
+    at the same scale.
+    """
+    regressions = []
+    for scale, current in report["scales"].items():
+        before = baseline.get("scales", {}).get(scale)
+        if before is None:
+            continue
+        speed = current["calibration_us"] / before["calibration_us"]
+        for name, result in current["cases"].items():
+            old = before["cases"].get(name)
+            if old is None:
+                continue
+            now_us, then_us = result["p50_us"], old["p50_us"] * speed
+            if now_us - then_us > NOISE_FLOOR_US and now_us > then_us * (1 + threshold):
+                regressions.append(
+                    f"scale {scale} {name}: p50 {then_us:.2f} -> {now_us:.2f} us ({now_us / then_us:.2f}x)"
+                )
+    return regressions
+
+
+def _scales(text: str) -> list[int]:
+    return [int(part) for part in text.split(",") if part]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the navigator's data paths.")
+    parser.add_argument("--scales", type=_scales, default=list(DEFAULT_SCALES), help="comma-separated multiples of 15 places")
+    parser.add_argument("--repeat", type=int, default=200, help="samples per case")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions of each case; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cases", help="comma-separated case names to run")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write the report to {BASELINE_PATH}")
+    args = parser.parse_args(argv)
+
+    # Shell compilation goes through Streamlit caches, which warn without a runtime
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    only = set(args.cases.split(",")) if args.cases else None
+    report = run(args.scales, args.repeat, args.warmup, args.seed, args.rounds, only)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.save_baseline:
+        BASELINE_PATH.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
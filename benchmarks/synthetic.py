@@ -0,0 +1,133 @@
+"""Synthetic campuses for benchmarking.
+
+A campus of any size is generated around the real campus centre with the same
+place density: ``n`` places in ``m`` categories, and a grid of junctions
+joined by walkways, with every ``road_every``-th street a road. Each place is
+a graph node linked to its nearest junction, as in ``data/paths.json``.
+Generation is deterministic for a given seed.
+"""
+
+import math
+import random
+from typing import NamedTuple
+
+from navigator.geo import METERS_PER_DEGREE
+from navigator.registry import Category, LocationRegistry, Place
+from navigator.routing import CampusGraph
+
+CENTER = (12.2122, 75.1350)
+
+# Area per place, matching the real campus
+SQUARE_M_PER_PLACE = 1600.0
+
+_NAMES = (
+    "Block", "Lab", "Hall", "Office", "Library", "Workshop", "Studio", "Store",
+    "Seminar Room", "Lecture Theatre", "Department", "Centre", "Annexe", "Hostel",
+)
+_QUALIFIERS = (
+    "Main", "North", "South", "East", "West", "Central", "Old", "New",
+    "Computer", "Electrical", "Mechanical", "Civil", "Chemistry", "Physics",
+)
+
+
+class Campus(NamedTuple):
+    """A generated registry and the path graph that serves it."""
+
+    registry: LocationRegistry
+    graph: CampusGraph
+
+
+def generate_campus(
+    n_places: int,
+    n_categories: int = 4,
+    grid: int | None = None,
+    road_every: int = 4,
+    seed: int = 7,
+) -> Campus:
+    """Generate a campus with ``n_places`` places.
+
+    ``grid`` is the number of junctions per side; by default there are about
+    as many junctions as places.
+    """
+    rng = random.Random(seed)
+    side_m = math.sqrt(n_places * SQUARE_M_PER_PLACE)
+    lat0, lng0 = CENTER
+    lat_span = side_m / METERS_PER_DEGREE
+    lng_span = side_m / (METERS_PER_DEGREE * math.cos(math.radians(lat0)))
+    south, west = lat0 - lat_span / 2, lng0 - lng_span / 2
+
+    categories = [Category(f"category-{i}", f"Category {i}") for i in range(n_categories)]
+    places = []
+    for i in range(n_places):
+        name = f"{rng.choice(_QUALIFIERS)} {rng.choice(_NAMES)} {i}"
+        lat = south + rng.random() * lat_span
+        lng = west + rng.random() * lng_span
+        places.append(
+            Place(
+                id=f"place-{i}",
+                name=name,
+                category=categories[rng.randrange(n_categories)].name,
+                lat=lat,
+                lng=lng,
+                url=f"https://maps.google.com/?q={lat:.6f},{lng:.6f}",
+                description=f"{name} on the synthetic campus",
+            )
+        )
+
+    grid = grid or max(2, round(math.sqrt(n_places)))
+    step_lat = lat_span / (grid - 1)
+    step_lng = lng_span / (grid - 1)
+    nodes = [
+        (f"j-{r}-{c}", south + r * step_lat, west + c * step_lng)
+        for r in range(grid)
+        for c in range(grid)
+    ]
+    edges = []
+    for r in range(grid):
+        for c in range(grid):
+            if c + 1 < grid:
+                kind = "road" if r % road_every == 0 else "walkway"
+                edges.append({"from": f"j-{r}-{c}", "to": f"j-{r}-{c + 1}", "kind": kind})
+            if r + 1 < grid:
+                kind = "road" if c % road_every == 0 else "walkway"
+                edges.append({"from": f"j-{r}-{c}", "to": f"j-{r + 1}-{c}", "kind": kind})
+    for place in places:
+        r = min(grid - 1, max(0, round((place.lat - south) / step_lat)))
+        c = min(grid - 1, max(0, round((place.lng - west) / step_lng)))
+        nodes.append((place.id, place.lat, place.lng))
+        edges.append({"from": place.id, "to": f"j-{r}-{c}", "kind": "walkway"})
+
+    graph = CampusGraph(nodes, edges, version=f"synthetic-{n_places}-{grid}-{seed}")
+    return Campus(LocationRegistry(categories, places), graph)
+
+
+def random_points(registry: LocationRegistry, count: int, seed: int = 11) -> list[tuple[float, float]]:
+    """Points spread over the bounding box of a registry."""
+    rng = random.Random(seed)
+    lats = [p.lat for p in registry]
+    lngs = [p.lng for p in registry]
+    return [
+        (rng.uniform(min(lats), max(lats)), rng.uniform(min(lngs), max(lngs)))
+        for _ in range(count)
+    ]
+
+
+def search_queries(registry: LocationRegistry, count: int, seed: int = 13) -> list[str]:
+    """A mix of exact, prefix, multi-term and misspelled queries."""
+    rng = random.Random(seed)
+    places = registry.places
+    queries = []
+    for i in range(count):
+        words = rng.choice(places).name.lower().split()
+        kind = i % 4
+        if kind == 0:
+            queries.append(words[1])
+        elif kind == 1:
+            queries.append(words[0][: max(2, len(words[0]) // 2)])
+        elif kind == 2:
+            queries.append(f"{words[0]} {words[1]}")
+        else:
+            word = words[1]
+            j = rng.randrange(1, len(word))
+            queries.append(word[:j] + word[j + 1 :])
+    return queries
@@ -0,0 +1 @@
+"""Server-side pieces of the LBS Campus Navigator Streamlit app."""
@@ -0,0 +1,260 @@
+"""JSON endpoints for the navigator component.
+
+The routes are mounted next to the Streamlit app by ``serve.py`` and share the
+process-wide registry and indexes with the script runs, including their
+updates when ``data/locations.json`` changes. Handlers are plain functions:
+their work is CPU-bound or blocks on disk, so Starlette runs them in its
+threadpool rather than on the event loop.
+"""
+
+import math
+from contextlib import asynccontextmanager
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from navigator.dataset import is_version, load_dataset_archive
+from navigator.distance import load_distance_engine
+from navigator.metrics import load_metrics
+from navigator.registry import Place, load_registry
+from navigator.routing import MODES, load_router
+from navigator.search import load_search_index
+from navigator.spatial import load_spatial_index
+from navigator.trending import load_trending
+
+API_PREFIX = "/navigator/api"
+
+# Upper bound on results per query, to keep responses small
+MAX_RESULTS = 50
+
+
+class BadRequest(ValueError):
+    """Raised for malformed query parameters."""
+
+
+def _float_param(request: Request, name: str) -> float:
+    raw = request.query_params.get(name)
+    if raw is None:
+        raise BadRequest(f"missing parameter: {name}")
+    try:
+        value = float(raw)
+    except ValueError:
+        raise BadRequest(f"{name} must be a number") from None
+    if not math.isfinite(value):
+        raise BadRequest(f"{name} must be finite")
+    return value
+
+
+def _place_json(place: Place, km: float) -> dict:
+    return {
+        "id": place.id,
+        "name": place.name,
+        "category": place.category,
+        "kind": place.kind,
+        "lat": place.lat,
+        "lng": place.lng,
+        "distance_km": round(km, 4),
+    }
+
+
+def _origin(request: Request) -> tuple[float, float]:
+    lat = _float_param(request, "lat")
+    lng = _float_param(request, "lng")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise BadRequest("lat/lng out of range")
+    return lat, lng
+
+
+def nearest(request: Request) -> JSONResponse:
+    """``GET /navigator/api/nearest?lat=&lng=[&n=][&category=|&kind=][&max_km=]``.
+
+    ``kind`` names what a place is, such as ``atm`` or ``canteen``, in any case.
+    """
+    registry = load_registry()
+    index = load_spatial_index()
+    try:
+        lat, lng = _origin(request)
+        try:
+            n = int(request.query_params.get("n", "1"))
+        except ValueError:
+            raise BadRequest("n must be an integer") from None
+        if not 1 <= n <= MAX_RESULTS:
+            raise BadRequest(f"n must be between 1 and {MAX_RESULTS}")
+        category = request.query_params.get("category") or None
+        if category is not None and not registry.in_category(category):
+            raise BadRequest(f"unknown category: {category}")
+        kind = request.query_params.get("kind", "").casefold() or None
+        if kind is not None and not registry.of_kind(kind):
+            raise BadRequest(f"unknown kind: {kind}")
+        if category is not None and kind is not None:
+            raise BadRequest("pass category or kind, not both")
+        max_km = _float_param(request, "max_km") if "max_km" in request.query_params else None
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    results = index.nearest(lat, lng, n=n, category=category, max_km=max_km, kind=kind)
+    return JSONResponse(
+        {
+            "version": registry.version,
+            "results": [_place_json(place, km) for place, km in results],
+        }
+    )
+
+
+def etas(request: Request) -> JSONResponse:
+    """``GET /navigator/api/etas?lat=&lng=``: distance and ETAs to every place.
+
+    Arrays are aligned with ``ids``; distances are in km, times in minutes.
+    """
+    registry = load_registry()
+    engine = load_distance_engine()
+    try:
+        lat, lng = _origin(request)
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    ids, result = engine.ids_and_etas_from(lat, lng)
+    return JSONResponse(
+        {
+            "version": registry.version,
+            "ids": ids,
+            "distance_km": result.distance_km.round(4).tolist(),
+            "walking_min": result.walking_min.round(1).tolist(),
+            "driving_min": result.driving_min.round(1).tolist(),
+        }
+    )
+
+
+def route(request: Request) -> JSONResponse:
+    """``GET /navigator/api/route?lat=&lng=&to=<place id>[&mode=walking|driving]``."""
+    registry = load_registry()
+    router = load_router()
+    try:
+        lat, lng = _origin(request)
+        place_id = request.query_params.get("to", "")
+        if place_id not in registry:
+            raise BadRequest(f"unknown place: {place_id}")
+        mode = request.query_params.get("mode", "walking")
+        if mode not in MODES:
+            raise BadRequest(f"mode must be one of {', '.join(MODES)}")
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    found = router.route(lat, lng, place_id, mode)
+    if found is None:
+        return JSONResponse({"error": "no route on the campus network"}, status_code=404)
+    return JSONResponse(
+        {
+            "version": registry.version,
+            "mode": found.mode,
+            "destination": found.destination,
+            "length_km": round(found.length_km, 4),
+            "eta_min": round(found.eta_min, 2),
+            "nodes": found.nodes,
+            "path": [[round(lat, 7), round(lng, 7)] for lat, lng in found.path],
+        }
+    )
+
+
+def search(request: Request) -> JSONResponse:
+    """``GET /navigator/api/search?q=[&limit=]``: ranked places, as in the component."""
+    registry = load_registry()
+    index = load_search_index()
+    try:
+        limit = int(request.query_params.get("limit", str(MAX_RESULTS)))
+    except ValueError:
+        return JSONResponse({"error": "limit must be an integer"}, status_code=400)
+    if not 1 <= limit <= MAX_RESULTS:
+        return JSONResponse({"error": f"limit must be between 1 and {MAX_RESULTS}"}, status_code=400)
+
+    hits = index.search(request.query_params.get("q", ""), limit)
+    results = []
+    for doc, score in hits:
+        # A reload may land between reading the registry and searching
+        place = registry.by_id.get(index.ids[doc])
+        if place is not None:
+            results.append({"id": place.id, "name": place.name, "score": round(score, 4)})
+    return JSONResponse({"version": registry.version, "results": results})
+
+
+def trending(request: Request) -> JSONResponse:
+    """``GET /navigator/api/trending[?n=]``: most visited places across sessions, decayed."""
+    registry = load_registry()
+    aggregator = load_trending()
+    try:
+        n = int(request.query_params.get("n", "5"))
+    except ValueError:
+        return JSONResponse({"error": "n must be an integer"}, status_code=400)
+    if not 1 <= n <= aggregator.k:
+        return JSONResponse({"error": f"n must be between 1 and {aggregator.k}"}, status_code=400)
+
+    results = [
+        {"id": trend.place_id, "name": registry.by_id[trend.place_id].name, "score": round(trend.score, 2)}
+        for trend in aggregator.top(n)
+        if trend.place_id in registry
+    ]
+    return JSONResponse(
+        {
+            "version": registry.version,
+            "half_life_s": aggregator.half_life_s,
+            "total": round(aggregator.total(), 2),
+            "results": results,
+        }
+    )
+
+
+def dataset(request: Request) -> JSONResponse:
+    """``GET /navigator/api/dataset?since=<version>``: changes to the places since a version.
+
+    Answers ``{"version": ...}`` alone when nothing changed, and 404 when the
+    version is not kept; the component then loads the full payload.
+    """
+    registry = load_registry()
+    since = request.query_params.get("since", "")
+    if not is_version(since):
+        return JSONResponse({"error": "since must be a registry version"}, status_code=400)
+    if since == registry.version:
+        return JSONResponse({"version": registry.version})
+    delta = load_dataset_archive().delta(since, registry)
+    if delta is None:
+        return JSONResponse({"error": f"unknown version: {since}"}, status_code=404)
+    return JSONResponse(delta)
+
+
+def metrics(request: Request) -> PlainTextResponse | JSONResponse:
+    """``GET /navigator/api/metrics``: rerun timings and counters for Prometheus."""
+    collected = load_metrics()
+    if not collected.enabled:
+        return JSONResponse({"error": "metrics are disabled; set NAVIGATOR_METRICS=1"}, status_code=404)
+    return PlainTextResponse(collected.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def warm() -> None:
+    """Load the registry, indexes and router the handlers share, route table included."""
+    load_registry()
+    load_search_index()
+    load_spatial_index()
+    load_distance_engine()
+    load_router()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Warm the shared indexes before serving, so no request pays for building them."""
+    await run_in_threadpool(warm)
+    yield
+
+
+def routes() -> list[Route]:
+    """Return the navigator API routes for ``st.App``."""
+    return [
+        Route(f"{API_PREFIX}/nearest", nearest, methods=["GET"]),
+        Route(f"{API_PREFIX}/etas", etas, methods=["GET"]),
+        Route(f"{API_PREFIX}/route", route, methods=["GET"]),
+        Route(f"{API_PREFIX}/search", search, methods=["GET"]),
+        Route(f"{API_PREFIX}/trending", trending, methods=["GET"]),
+        Route(f"{API_PREFIX}/dataset", dataset, methods=["GET"]),
+        Route(f"{API_PREFIX}/metrics", metrics, methods=["GET"]),
+    ]
@@ -0,0 +1,114 @@
+"""Registry snapshots and deltas for the navigator's client cache.
+
+The navigator keeps the registry payload (``LocationRegistry.to_client``) in
+browser storage, keyed by its version. A page built for a newer version asks
+``/navigator/api/dataset?since=<stored version>`` for the changes instead of
+downloading the whole payload again.
+
+Deltas are computed against snapshots of the payloads served before, kept in
+``NAVIGATOR_DATASET_DIR`` (``.cache/datasets`` by default). The newest
+``KEEP_VERSIONS`` are kept; clients on an older version get the full payload.
+
+A delta carries the new categories and rebuilds the place list from runs:
+``[start, count]`` copies ``count`` places from position ``start`` of the
+stored list, and any other entry is a full place record, added or changed.
+Copied records keep their category by name, so reordered categories are
+remapped on the client.
+"""
+
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+import streamlit as st
+
+from navigator.registry import LocationRegistry
+
+DATASET_DIR = Path(
+    os.environ.get(
+        "NAVIGATOR_DATASET_DIR",
+        Path(__file__).resolve().parent.parent / ".cache" / "datasets",
+    )
+)
+
+# Snapshots kept; clients on an older version download the full payload
+KEEP_VERSIONS = 20
+
+_VERSION_RE = re.compile(r"[0-9a-f]{16}")
+
+
+def is_version(text: str) -> bool:
+    """Whether ``text`` has the form of a registry version."""
+    return _VERSION_RE.fullmatch(text) is not None
+
+
+def compute_delta(old: dict, new: dict) -> dict:
+    """Runs turning the client payload ``old`` into ``new``."""
+    old_names = [name for name, _ in old["categories"]]
+    new_names = [name for name, _ in new["categories"]]
+    positions = {record[0]: i for i, record in enumerate(old["places"])}
+
+    runs: list[list] = []
+    for record in new["places"]:
+        i = positions.get(record[0])
+        unchanged = (
+            i is not None
+            and old["places"][i][:2] + old["places"][i][3:] == record[:2] + record[3:]
+            and old_names[old["places"][i][2]] == new_names[record[2]]
+        )
+        if not unchanged:
+            runs.append(record)
+        elif runs and len(runs[-1]) == 2 and sum(runs[-1]) == i:
+            runs[-1][1] += 1
+        else:
+            runs.append([i, 1])
+    return {"version": new["version"], "base": old["version"], "categories": new["categories"], "runs": runs}
+
+
+class DatasetArchive:
+    """Client payloads of recent registry versions, one JSON file each."""
+
+    def __init__(self, directory: Path = DATASET_DIR, keep: int = KEEP_VERSIONS) -> None:
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def add(self, registry: LocationRegistry) -> None:
+        """Snapshot the payload of ``registry`` unless it already is."""
+        path = self.directory / f"{registry.version}.json"
+        if path.is_file():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".dataset-", dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            out.write(registry.client_json)
+        os.replace(tmp, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        snapshots = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in snapshots[self.keep :]:
+            stale.unlink(missing_ok=True)
+
+    def payload(self, version: str) -> dict | None:
+        """The snapshot of ``version``, or None when it is not kept."""
+        if not is_version(version):
+            return None
+        try:
+            return json.loads((self.directory / f"{version}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def delta(self, since: str, registry: LocationRegistry) -> dict | None:
+        """Changes from version ``since`` to ``registry``, or None when ``since`` is not kept."""
+        old = self.payload(since)
+        if old is None:
+            return None
+        return compute_delta(old, registry.to_client())
+
+
+@st.cache_resource(show_spinner=False)
+def load_dataset_archive() -> DatasetArchive:
+    """Return the process-wide dataset archive."""
+    return DatasetArchive()
@@ -0,0 +1,207 @@
+"""Vectorized distance and ETA engine.
+
+The scalar ``distanceKm`` / ``calculateWalkingTime`` / ``calculateDrivingTime``
+helpers in the navigator work on one pair at a time. This engine keeps every
+place's coordinates in NumPy arrays and answers one-origin-to-all queries in a
+single vectorized haversine. It also holds the place-to-place matrix, built on
+first use and patched one row and column at a time when a place is added,
+moved or removed; registry changes are applied the same way.
+"""
+
+import threading
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import streamlit as st
+
+from navigator.geo import EARTH_RADIUS_KM
+from navigator.registry import LocationRegistry, Place, RegistryChanges, load_registry_watcher
+
+# Same flat speeds as the navigator's time estimates
+WALKING_KMH = 5.0
+DRIVING_KMH = 30.0
+
+
+class Etas(NamedTuple):
+    """Distances and travel times from one origin, aligned with ``DistanceEngine.ids``."""
+
+    distance_km: np.ndarray
+    walking_min: np.ndarray
+    driving_min: np.ndarray
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Broadcasting haversine distance in km; all arguments in degrees."""
+    lat1, lng1, lat2, lng2 = (
+        np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lng1, lat2, lng2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def walking_minutes(km) -> np.ndarray:
+    """Walking time in minutes at ``WALKING_KMH``."""
+    return np.asarray(km) / WALKING_KMH * 60.0
+
+
+def driving_minutes(km) -> np.ndarray:
+    """Driving time in minutes at ``DRIVING_KMH``, never below one minute."""
+    return np.maximum(np.asarray(km) / DRIVING_KMH * 60.0, 1.0)
+
+
+class DistanceEngine:
+    """Bulk distances between an origin and every place, and between places."""
+
+    def __init__(self, places: Iterable[Place]) -> None:
+        places = list(places)
+        self._lock = threading.Lock()
+        self._ids: list[str] = [p.id for p in places]
+        self._index = {place_id: i for i, place_id in enumerate(self._ids)}
+        if len(self._index) != len(self._ids):
+            raise ValueError("Duplicate place ids")
+        capacity = max(len(places), 16)
+        self._lat = np.empty(capacity, dtype=np.float64)
+        self._lng = np.empty(capacity, dtype=np.float64)
+        self._lat[: len(places)] = [p.lat for p in places]
+        self._lng[: len(places)] = [p.lng for p in places]
+        # Matrix storage (capacity x capacity), allocated on first use. float32
+        # keeps centimetre precision at campus scale and halves the memory.
+        self._matrix: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def ids(self) -> list[str]:
+        """Place ids in the order used by every returned array."""
+        return list(self._ids)
+
+    def index_of(self, place_id: str) -> int:
+        """Return the array position of a place id."""
+        return self._index[place_id]
+
+    def distances_from(self, lat: float, lng: float) -> np.ndarray:
+        """Distance in km from one origin to every place."""
+        with self._lock:
+            return self._distances(lat, lng)
+
+    def etas_from(self, lat: float, lng: float) -> Etas:
+        """Distance plus walking and driving minutes from one origin to every place."""
+        return self.ids_and_etas_from(lat, lng)[1]
+
+    def ids_and_etas_from(self, lat: float, lng: float) -> tuple[list[str], Etas]:
+        """``ids`` and ``etas_from`` read together, so a registry change cannot fall between them."""
+        with self._lock:
+            ids = list(self._ids)
+            km = self._distances(lat, lng)
+        return ids, Etas(km, walking_minutes(km), driving_minutes(km))
+
+    def nearest_order(self, lat: float, lng: float) -> list[str]:
+        """Place ids sorted from nearest to farthest."""
+        with self._lock:
+            ids = list(self._ids)
+            km = self._distances(lat, lng)
+        return [ids[i] for i in np.argsort(km, kind="stable")]
+
+    def matrix(self) -> np.ndarray:
+        """Place-to-place distance matrix in km, in ``ids`` order.
+
+        Returns a copy: registry changes patch the engine's matrix in place.
+        """
+        with self._lock:
+            n = len(self._ids)
+            return self._full_matrix()[:n, :n].copy()
+
+    def distance(self, from_id: str, to_id: str) -> float:
+        """Distance in km between two registered places."""
+        with self._lock:
+            return float(self._full_matrix()[self._index[from_id], self._index[to_id]])
+
+    def upsert(self, place: Place) -> None:
+        """Add a place or move an existing one, patching only its matrix row and column."""
+        with self._lock:
+            self._upsert(place)
+
+    def remove(self, place_id: str) -> None:
+        """Drop a place; the last place takes over its slot. Unknown ids are ignored."""
+        with self._lock:
+            self._remove(place_id)
+
+    def apply_changes(self, changes: RegistryChanges, registry: LocationRegistry) -> None:
+        """Patch the places added, moved or removed by a registry change, all under the lock.
+
+        Queries see the places before or after the change, never a mix.
+        """
+        with self._lock:
+            for place in changes.removed:
+                self._remove(place.id)
+            for place in changes.added + changes.moved:
+                self._upsert(place)
+
+    def _distances(self, lat: float, lng: float) -> np.ndarray:
+        n = len(self._ids)
+        return haversine_km(lat, lng, self._lat[:n], self._lng[:n])
+
+    def _upsert(self, place: Place) -> None:
+        i = self._index.get(place.id)
+        if i is None:
+            i = len(self._ids)
+            if i == len(self._lat):
+                self._grow(i + max(16, i // 4))
+            self._ids.append(place.id)
+            self._index[place.id] = i
+        self._lat[i] = place.lat
+        self._lng[i] = place.lng
+        if self._matrix is not None:
+            self._patch(i)
+
+    def _remove(self, place_id: str) -> None:
+        i = self._index.pop(place_id, None)
+        if i is None:
+            return
+        last = len(self._ids) - 1
+        if i != last:
+            moved = self._ids[last]
+            self._ids[i] = moved
+            self._index[moved] = i
+            self._lat[i] = self._lat[last]
+            self._lng[i] = self._lng[last]
+            if self._matrix is not None:
+                self._matrix[i, : last + 1] = self._matrix[last, : last + 1]
+                self._matrix[: last + 1, i] = self._matrix[: last + 1, last]
+                self._matrix[i, i] = 0.0
+        self._ids.pop()
+
+    def _grow(self, capacity: int) -> None:
+        n = len(self._ids)
+        for name in ("_lat", "_lng"):
+            grown = np.empty(capacity, dtype=np.float64)
+            grown[:n] = getattr(self, name)[:n]
+            setattr(self, name, grown)
+        if self._matrix is not None:
+            grown = np.zeros((capacity, capacity), dtype=np.float32)
+            grown[:n, :n] = self._matrix[:n, :n]
+            self._matrix = grown
+
+    def _full_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            n, capacity = len(self._ids), len(self._lat)
+            self._matrix = np.zeros((capacity, capacity), dtype=np.float32)
+            lat, lng = self._lat[:n], self._lng[:n]
+            self._matrix[:n, :n] = haversine_km(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+        return self._matrix
+
+    def _patch(self, i: int) -> None:
+        n = len(self._ids)
+        row = haversine_km(self._lat[i], self._lng[i], self._lat[:n], self._lng[:n])
+        self._matrix[i, :n] = row
+        self._matrix[:n, i] = row
+
+
+@st.cache_resource(show_spinner=False)
+def load_distance_engine() -> DistanceEngine:
+    """Return the process-wide distance engine, kept in step with the registry."""
+    return load_registry_watcher().subscribe(DistanceEngine)
@@ -0,0 +1,19 @@
+"""Geometry helpers shared by the server-side navigator modules."""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0
+
+# Length of one degree of latitude, in metres
+METERS_PER_DEGREE = 111_320.0
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in km (same as the JS ``distanceKm``)."""
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_lat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
@@ -0,0 +1,178 @@
+"""Per-session navigation history.
+
+The navigator component reports every navigation as its value. Events are
+validated against the registry and kept in a fixed-capacity ring buffer, so a
+session holds at most ``capacity`` entries however long it stays open. With a
+``HistoryStore`` attached, visits are also persisted and a reconnecting
+session starts from its stored visits; sessions are identified by a cookie.
+"""
+
+import math
+import re
+import uuid
+from collections import deque
+from typing import Iterator, NamedTuple
+
+import streamlit as st
+from starlette.requests import HTTPConnection
+
+from navigator.registry import LocationRegistry
+from navigator.routing import MODES
+
+HISTORY_CAPACITY = 20
+
+# Longest client-supplied time label that is kept
+MAX_TIME_LENGTH = 32
+
+# Cookie carrying the session id across reconnects and reloads; it is
+# issued by SessionCookieMiddleware and never appears in a URL
+SESSION_COOKIE = "navigator_sid"
+SESSION_MAX_AGE = 365 * 24 * 3600
+# Query parameter that carried the id before the cookie; dropped on sight
+LEGACY_SESSION_PARAM = "sid"
+_SESSION_RE = re.compile(r"[0-9a-f]{32}")
+
+
+class Visit(NamedTuple):
+    """One navigation started from the component."""
+
+    place_id: str
+    destination: str
+    time: str
+    distance_km: float
+    mode: str
+
+
+class NavigationHistory:
+    """The latest ``capacity`` visits of a session, oldest first."""
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY, store=None, session: str = "") -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._visits: deque[Visit] = deque(maxlen=capacity)
+        # Id of the last component event, so a replayed value is not recorded twice
+        self.last_event_id: str | None = None
+        # Optional ``HistoryStore`` (see history_store) that visits are written to
+        self.store = store
+        self.session = session
+        if store is not None:
+            for stored in reversed(store.latest(session, capacity)):
+                self._visits.append(stored.visit())
+
+    @property
+    def capacity(self) -> int:
+        return self._visits.maxlen
+
+    def __len__(self) -> int:
+        return len(self._visits)
+
+    def __iter__(self) -> Iterator[Visit]:
+        return iter(self._visits)
+
+    def append(self, visit: Visit) -> None:
+        """Add a visit, evicting the oldest one when full."""
+        self._visits.append(visit)
+
+    def latest(self, n: int) -> list[Visit]:
+        """Up to ``n`` most recent visits, newest first."""
+        visits = []
+        for visit in reversed(self._visits):
+            if len(visits) == n:
+                break
+            visits.append(visit)
+        return visits
+
+    def clear(self) -> None:
+        """Forget every visit, including stored ones."""
+        self._visits.clear()
+        if self.store is not None:
+            self.store.clear_session(self.session)
+
+    def record_event(self, event, registry: LocationRegistry) -> Visit | None:
+        """Record a navigation event from the component.
+
+        Events are browser input: anything malformed, repeated or naming an
+        unknown place is ignored and ``None`` returned.
+        """
+        visit = visit_from_event(event, registry)
+        if visit is None or event["id"] == self.last_event_id:
+            return None
+        self.last_event_id = event["id"]
+        self.append(visit)
+        if self.store is not None:
+            self.store.record(self.session, visit)
+        return visit
+
+
+def visit_from_event(event, registry: LocationRegistry) -> Visit | None:
+    """Build a ``Visit`` from a component event, or ``None`` if it is invalid."""
+    if not isinstance(event, dict) or event.get("type") != "navigate":
+        return None
+    if not isinstance(event.get("id"), str):
+        return None
+    place_id = event.get("place")
+    mode = event.get("mode")
+    distance_km = event.get("distance_km")
+    time = event.get("time")
+    if not isinstance(place_id, str) or place_id not in registry or mode not in MODES:
+        return None
+    if isinstance(distance_km, bool) or not isinstance(distance_km, (int, float)):
+        return None
+    if not math.isfinite(distance_km) or distance_km < 0:
+        return None
+    if not isinstance(time, str):
+        return None
+    return Visit(
+        place_id=place_id,
+        destination=registry.by_id[place_id].name,
+        time=time[:MAX_TIME_LENGTH],
+        distance_km=float(distance_km),
+        mode=mode,
+    )
+
+
+def session_id() -> str:
+    """Id of the current browser, from the ``navigator_sid`` cookie.
+
+    The cookie is HttpOnly and never part of a URL, so a shared link carries
+    neither the visits nor the means to clear them. Without it, as under
+    ``streamlit run`` where the middleware is not mounted, a new id is used
+    and visits last as long as the session.
+    """
+    if LEGACY_SESSION_PARAM in st.query_params:
+        del st.query_params[LEGACY_SESSION_PARAM]
+    sid = st.context.cookies.get(SESSION_COOKIE, "")
+    if not isinstance(sid, str) or not _SESSION_RE.fullmatch(sid):
+        sid = uuid.uuid4().hex
+    return sid
+
+
+def _has_session(scope) -> bool:
+    return bool(_SESSION_RE.fullmatch(HTTPConnection(scope).cookies.get(SESSION_COOKIE, "")))
+
+
+class SessionCookieMiddleware:
+    """ASGI middleware issuing the session cookie to browsers that lack one.
+
+    Streamlit reads cookies from the WebSocket handshake, which follows the
+    page load, so the id set on the page response is the one scripts see.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or _has_session(scope):
+            await self.app(scope, receive, send)
+            return
+
+        cookie = (
+            f"{SESSION_COOKIE}={uuid.uuid4().hex}; Path=/; Max-Age={SESSION_MAX_AGE}; HttpOnly; SameSite=Lax"
+        ).encode("ascii")
+
+        async def send_with_cookie(message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message["headers"], (b"set-cookie", cookie)]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
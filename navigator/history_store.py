@@ -0,0 +1,310 @@
+"""Durable navigation history in SQLite.
+
+Visits are written to a local database in WAL mode, so readers never wait for
+the writer. Scripts only put visits on a queue; a background thread drains it
+and commits each batch in a single transaction, so a tap never waits on disk.
+Visits are indexed by session, destination and time, which keeps the latest
+visits of a session and per-destination queries fast at any table size.
+Ranges are exported with keyset pagination, a batch of rows at a time.
+
+Export from the command line with
+``python -m navigator.history_store [--since ISO] [--until ISO] [--format csv|jsonl]``.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, NamedTuple, TextIO
+
+import streamlit as st
+
+from navigator.history import Visit
+
+DB_PATH = Path(
+    os.environ.get(
+        "NAVIGATOR_HISTORY_DB",
+        Path(__file__).resolve().parent.parent / ".data" / "history.sqlite3",
+    )
+)
+
+# Upper bound on visits committed per transaction
+BATCH_SIZE = 500
+# How long the writer waits for more visits before committing a batch
+FLUSH_INTERVAL = 0.25
+# Visits waiting for the writer; beyond this new visits are dropped
+MAX_PENDING = 10_000
+# Rows fetched per query while exporting
+EXPORT_BATCH = 1_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    place_id TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    distance_km REAL NOT NULL,
+    client_time TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visits_session_ts ON visits (session, ts);
+CREATE INDEX IF NOT EXISTS visits_place_ts ON visits (place_id, ts);
+CREATE INDEX IF NOT EXISTS visits_ts ON visits (ts);
+"""
+
+EXPORT_COLUMNS = ("id", "ts", "session", "place_id", "destination", "mode", "distance_km", "client_time")
+
+_log = logging.getLogger(__name__)
+
+
+class StoredVisit(NamedTuple):
+    """A visit as stored, with its row id, session and server timestamp."""
+
+    id: int
+    ts: float
+    session: str
+    place_id: str
+    destination: str
+    mode: str
+    distance_km: float
+    client_time: str
+
+    def visit(self) -> Visit:
+        return Visit(self.place_id, self.destination, self.client_time, self.distance_km, self.mode)
+
+
+_COLUMNS = ", ".join(StoredVisit._fields)
+_INSERT = (
+    "INSERT INTO visits (session, place_id, destination, mode, distance_km, client_time, ts) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class HistoryStore:
+    """SQLite-backed visit log with a background batching writer."""
+
+    def __init__(self, path: Path = DB_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_PENDING)
+        self._readers = threading.local()
+        self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = self._connect()
+        return conn
+
+    # Writes
+
+    def record(self, session: str, visit: Visit, ts: float | None = None) -> bool:
+        """Queue a visit; returns ``False`` if the writer is too far behind."""
+        row = (
+            session,
+            visit.place_id,
+            visit.destination,
+            visit.mode,
+            visit.distance_km,
+            visit.time,
+            time.time() if ts is None else ts,
+        )
+        return self._put(("insert", row))
+
+    def clear_session(self, session: str) -> bool:
+        """Queue the removal of every visit of a session."""
+        return self._put(("clear", session))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until everything queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Commit pending visits and stop the writer."""
+        if self._writer.is_alive():
+            self._queue.put(("stop", None))
+            self._writer.join()
+
+    def _put(self, op: tuple) -> bool:
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                while len(batch) < BATCH_SIZE and batch[-1][0] == "insert":
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                try:
+                    self._apply(conn, batch)
+                except sqlite3.Error:
+                    _log.exception("Could not write %d history operations", len(batch))
+                for kind, arg in batch:
+                    if kind == "flush":
+                        arg.set()
+                if batch[-1][0] == "stop":
+                    return
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, batch: list[tuple]) -> None:
+        with conn:
+            rows: list[tuple] = []
+            for kind, arg in batch:
+                if kind == "insert":
+                    rows.append(arg)
+                    continue
+                # Keep queue order: inserts before a clear are written first
+                if rows:
+                    conn.executemany(_INSERT, rows)
+                    rows = []
+                if kind == "clear":
+                    conn.execute("DELETE FROM visits WHERE session = ?", (arg,))
+            if rows:
+                conn.executemany(_INSERT, rows)
+
+    # Reads
+
+    def latest(self, session: str, n: int = 5) -> list[StoredVisit]:
+        """The ``n`` most recent visits of a session, newest first."""
+        rows = self._reader().execute(
+            f"SELECT {_COLUMNS} FROM visits WHERE session = ? ORDER BY ts DESC, id DESC LIMIT ?",
+            (session, n),
+        )
+        return [StoredVisit(*row) for row in rows]
+
+    def for_destination(
+        self, place_id: str, since: float | None = None, until: float | None = None, limit: int = 100
+    ) -> list[StoredVisit]:
+        """Most recent visits to one place in ``[since, until)``, newest first."""
+        rows = self._reader().execute(
+            f"SELECT {_COLUMNS} FROM visits WHERE place_id = ? AND ts >= ? AND ts < ? "
+            "ORDER BY ts DESC, id DESC LIMIT ?",
+            (place_id, _lower(since), _upper(until), limit),
+        )
+        return [StoredVisit(*row) for row in rows]
+
+    def count(self, since: float | None = None, until: float | None = None) -> int:
+        """Number of visits in ``[since, until)``."""
+        (total,) = self._reader().execute(
+            "SELECT COUNT(*) FROM visits WHERE ts >= ? AND ts < ?", (_lower(since), _upper(until))
+        ).fetchone()
+        return total
+
+    def iter_range(
+        self, since: float | None = None, until: float | None = None, batch_size: int = EXPORT_BATCH
+    ) -> Iterator[StoredVisit]:
+        """Yield every visit in ``[since, until)`` in time order.
+
+        Each batch is a separate short query continuing after the last row
+        seen, so no read transaction stays open for the whole export.
+        """
+        conn = self._connect()
+        try:
+            # Row ids start at 1, so this includes visits at exactly ``since``
+            after = (_lower(since), 0)
+            end = _upper(until)
+            while True:
+                rows = conn.execute(
+                    f"SELECT {_COLUMNS} FROM visits WHERE (ts, id) > (?, ?) AND ts < ? "
+                    "ORDER BY ts, id LIMIT ?",
+                    (*after, end, batch_size),
+                ).fetchall()
+                for row in rows:
+                    yield StoredVisit(*row)
+                if len(rows) < batch_size:
+                    return
+                after = (rows[-1][1], rows[-1][0])
+        finally:
+            conn.close()
+
+    def export(
+        self, out: TextIO, since: float | None = None, until: float | None = None, fmt: str = "csv"
+    ) -> int:
+        """Write visits in ``[since, until)`` to ``out`` as CSV or JSON lines; returns the row count."""
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown export format: {fmt!r}")
+        writer = csv.writer(out) if fmt == "csv" else None
+        if writer:
+            writer.writerow(EXPORT_COLUMNS)
+        written = 0
+        for visit in self.iter_range(since, until):
+            if writer:
+                writer.writerow(visit)
+            else:
+                out.write(json.dumps(visit._asdict(), separators=(",", ":")) + "\n")
+            written += 1
+        return written
+
+
+def _lower(since: float | None) -> float:
+    return float("-inf") if since is None else since
+
+
+def _upper(until: float | None) -> float:
+    return float("inf") if until is None else until
+
+
+@st.cache_resource(show_spinner=False)
+def load_history_store() -> HistoryStore:
+    """Return the process-wide history store."""
+    return HistoryStore(DB_PATH)
+
+
+def _timestamp(text: str) -> float:
+    return datetime.fromisoformat(text).timestamp()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Stream a range of the history to stdout."""
+    parser = argparse.ArgumentParser(description="Export navigation history.")
+    parser.add_argument("--since", type=_timestamp, help="ISO date or time, inclusive")
+    parser.add_argument("--until", type=_timestamp, help="ISO date or time, exclusive")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    try:
+        written = store.export(sys.stdout, args.since, args.until, args.format)
+    finally:
+        store.close()
+    print(f"Exported {written} visits from {args.db}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
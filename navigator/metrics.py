@@ -0,0 +1,244 @@
+"""Per-rerun timing and counters.
+
+``app.py`` marks the phases of each script run (header, sidebar, navigator,
+stats, ...) on a ``RerunTimer``. Finished runs add their phase times to
+process-wide histograms, next to counters of reruns, bytes sent to the
+browser and navigation events. The metrics are exported in the Prometheus
+text format, at ``/navigator/api/metrics`` under ``serve.py`` and to a file
+for a node exporter's textfile collector, and each run can be logged as one
+line of JSON.
+
+Collection is off unless one of these is set:
+
+- ``NAVIGATOR_METRICS=1``: collect, for the endpoint only;
+- ``NAVIGATOR_METRICS_FILE=<path>``: also write the Prometheus text there;
+- ``NAVIGATOR_METRICS_LOG=1``: also log every run to the
+  ``navigator.metrics`` logger, to stderr unless it has handlers.
+
+Disabled, every script run gets the same no-op timer, so the cost is a few
+method calls.
+"""
+
+import bisect
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+METRICS_FILE = os.environ.get("NAVIGATOR_METRICS_FILE") or None
+JSON_LOG = os.environ.get("NAVIGATOR_METRICS_LOG", "") not in ("", "0")
+ENABLED = os.environ.get("NAVIGATOR_METRICS", "") not in ("", "0") or bool(METRICS_FILE) or JSON_LOG
+
+# Minimum seconds between two writes of the metrics file
+WRITE_INTERVAL = 10.0
+
+# Upper bounds, in seconds, of the histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PREFIX = "navigator"
+
+# Counters and their help text
+COUNTERS = {
+    "reruns": "Script runs that finished.",
+    "payload_bytes": "Bytes of messages sent to browsers by finished script runs.",
+    "history_events": "Navigation events recorded in a session history.",
+}
+
+_log = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed seconds."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def lines(self, name: str, labels: str = "") -> list[str]:
+        lines = []
+        cumulative = 0
+        sep = "," if labels else ""
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum!r}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class RerunTimer:
+    """Times the phases of one script run.
+
+    ``phase(name)`` ends the running phase and starts ``name``; ``finish()``
+    ends the last one and records the run. A run stopped by ``st.rerun()`` or
+    an exception is never finished and not recorded.
+    """
+
+    def __init__(self, metrics: "Metrics") -> None:
+        self.metrics = metrics
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self.payload_bytes = 0
+        self._phase: str | None = None
+        self._phase_started = self.started
+        self.session = ""
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is not None:
+            self.session = ctx.session_id
+            self._count_payload(ctx)
+
+    def _count_payload(self, ctx) -> None:
+        # Every message of the run goes through the context's enqueue; count
+        # them into this run, replacing the hook of an earlier run
+        enqueue = getattr(ctx._enqueue, "__wrapped__", ctx._enqueue)
+
+        def counting_enqueue(msg):
+            self.payload_bytes += msg.ByteSize()
+            enqueue(msg)
+
+        counting_enqueue.__wrapped__ = enqueue
+        ctx._enqueue = counting_enqueue
+
+    def phase(self, name: str) -> None:
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases.append((self._phase, now - self._phase_started))
+        self._phase = name
+        self._phase_started = now
+
+    def finish(self) -> None:
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases.append((self._phase, now - self._phase_started))
+            self._phase = None
+        self.metrics.record_rerun(self, now - self.started)
+
+
+class _NullTimer:
+    """The timer handed out while metrics are disabled."""
+
+    __slots__ = ()
+
+    def phase(self, name: str) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Process-wide histograms and counters, shared by every session."""
+
+    def __init__(
+        self,
+        enabled: bool = ENABLED,
+        path: str | Path | None = METRICS_FILE,
+        json_log: bool = JSON_LOG,
+        write_interval: float = WRITE_INTERVAL,
+    ) -> None:
+        self.enabled = enabled
+        self.path = Path(path) if path else None
+        self.json_log = json_log
+        self.write_interval = write_interval
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._reruns = Histogram()
+        self._phases: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+        if enabled and json_log and not _log.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _log.addHandler(handler)
+            _log.setLevel(logging.INFO)
+            _log.propagate = False
+
+    def rerun(self) -> RerunTimer | _NullTimer:
+        """Start timing the current script run."""
+        return RerunTimer(self) if self.enabled else _NULL_TIMER
+
+    def inc(self, counter: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[counter] += value
+
+    def record_rerun(self, timer: RerunTimer, seconds: float) -> None:
+        with self._lock:
+            self._counters["reruns"] += 1
+            self._counters["payload_bytes"] += timer.payload_bytes
+            self._reruns.observe(seconds)
+            for name, elapsed in timer.phases:
+                histogram = self._phases.get(name)
+                if histogram is None:
+                    histogram = self._phases[name] = Histogram()
+                histogram.observe(elapsed)
+        if self.json_log:
+            _log.info(
+                json.dumps(
+                    {
+                        "event": "rerun",
+                        "ts": round(time.time(), 3),
+                        "session": timer.session,
+                        "ms": round(seconds * 1000, 3),
+                        "phases_ms": {name: round(elapsed * 1000, 3) for name, elapsed in timer.phases},
+                        "payload_bytes": timer.payload_bytes,
+                    },
+                    separators=(",", ":"),
+                )
+            )
+        if self.path is not None and time.monotonic() - self._last_write >= self.write_interval:
+            self.write()
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for counter, help_text in COUNTERS.items():
+                name = f"{PREFIX}_{counter}_total"
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {self._counters[counter]}"]
+            name = f"{PREFIX}_rerun_seconds"
+            lines += [f"# HELP {name} Wall time of finished script runs.", f"# TYPE {name} histogram"]
+            lines += self._reruns.lines(name)
+            name = f"{PREFIX}_phase_seconds"
+            lines += [f"# HELP {name} Wall time of each phase of finished script runs.", f"# TYPE {name} histogram"]
+            for phase, histogram in sorted(self._phases.items()):
+                lines += histogram.lines(name, f'phase="{phase}"')
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        """Replace the metrics file atomically, for the textfile collector."""
+        self._last_write = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".metrics-", dir=self.path.parent)
+            with os.fdopen(fd, "w", encoding="utf-8") as out:
+                out.write(self.prometheus())
+            os.replace(tmp, self.path)
+        except OSError:
+            _log.exception("Could not write metrics to %s", self.path)
+
+
+@st.cache_resource(show_spinner=False)
+def load_metrics() -> Metrics:
+    """Return the process-wide metrics."""
+    return Metrics()
@@ -0,0 +1,211 @@
+"""On-demand sampling profiles of single script runs.
+
+A profiled run is sampled from a background thread that reads the script
+thread's stack every ``interval`` seconds with ``sys._current_frames``, so
+the run itself is not slowed by tracing. When the run ends, normally, by
+``st.rerun()`` or by an exception, its stacks are written in the collapsed
+format read by ``flamegraph.pl``, speedscope and similar tools, one file per
+run, named after the time, the session and the widget keys whose values
+changed since the session's previous run (``load`` for a first run).
+
+Profiling is armed in one of two ways:
+
+- ``NAVIGATOR_PROFILE_RUNS=N`` profiles the next ``N`` runs of the process,
+  in any session;
+- with ``NAVIGATOR_PROFILE_TOKEN`` set, opening the app with
+  ``?profile=<token>`` profiles that session's next ``SESSION_RUNS`` runs.
+
+Profiles go to ``NAVIGATOR_PROFILE_DIR``, ``.data/profiles`` by default.
+Samples are taken when the sampler gets the GIL, so pure-Python stretches
+are resolved to about ``sys.getswitchinterval()`` (5 ms by default).
+"""
+
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROFILE_DIR = Path(os.environ.get("NAVIGATOR_PROFILE_DIR", ROOT / ".data" / "profiles"))
+PROFILE_RUNS = int(os.environ.get("NAVIGATOR_PROFILE_RUNS", "0") or 0)
+PROFILE_TOKEN = os.environ.get("NAVIGATOR_PROFILE_TOKEN", "")
+
+# Query parameter carrying the admin token
+PROFILE_PARAM = "profile"
+# Runs profiled in a session armed with the token
+SESSION_RUNS = 5
+# Seconds between two samples
+SAMPLE_INTERVAL = 0.001
+# Sampling of one run stops after this many seconds
+MAX_SECONDS = 120.0
+
+# Session state keys: widget values of the previous run, profiled runs left
+_INPUTS_KEY = "_profile_inputs"
+_RUNS_KEY = "_profile_runs"
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.+-]+")
+
+_log = logging.getLogger(__name__)
+
+
+def _frame_label(code, cache: dict) -> str:
+    label = cache.get(code)
+    if label is None:
+        path = code.co_filename
+        if "site-packages" in path:
+            path = path.rsplit("site-packages", 1)[1].lstrip("/\\")
+        elif path.startswith(str(ROOT)):
+            path = os.path.relpath(path, ROOT)
+        label = cache[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+    return label
+
+
+class SampledRun:
+    """Samples one script run until its module frame leaves the stack."""
+
+    def __init__(self, module_frame, path: Path, interval: float = SAMPLE_INTERVAL) -> None:
+        self.path = path
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._frame = module_frame
+        self._ident = threading.get_ident()
+        self._labels: dict = {}
+        self._thread = threading.Thread(target=self._sample, name="navigator-profiler", daemon=True)
+        self._thread.start()
+
+    def _stack(self) -> str | None:
+        frame = sys._current_frames().get(self._ident)
+        labels = []
+        found = False
+        while frame is not None:
+            found = found or frame is self._frame
+            labels.append(_frame_label(frame.f_code, self._labels))
+            frame = frame.f_back
+        return ";".join(reversed(labels)) if found else None
+
+    def _sample(self) -> None:
+        started = time.perf_counter()
+        while time.perf_counter() - started < MAX_SECONDS:
+            stack = self._stack()
+            if stack is None:
+                break
+            self.samples[stack] += 1
+            time.sleep(self.interval)
+        elapsed = time.perf_counter() - started
+        self._frame = None
+        self._write(elapsed)
+
+    def _write(self, elapsed: float) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as out:
+                for stack, count in sorted(self.samples.items()):
+                    out.write(f"{stack} {count}\n")
+        except OSError:
+            _log.exception("Could not write profile %s", self.path)
+            return
+        _log.info(
+            "Profiled %.0f ms run, %d samples: %s", elapsed * 1000, sum(self.samples.values()), self.path
+        )
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+
+class Profiler:
+    """Decides which runs are profiled and starts their samplers."""
+
+    def __init__(
+        self,
+        runs: int = PROFILE_RUNS,
+        token: str = PROFILE_TOKEN,
+        directory: Path = PROFILE_DIR,
+        session_runs: int = SESSION_RUNS,
+        interval: float = SAMPLE_INTERVAL,
+    ) -> None:
+        self.directory = Path(directory)
+        self.token = token
+        self.session_runs = session_runs
+        self.interval = interval
+        self._runs = runs
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._runs > 0 or bool(self.token)
+
+    def _take_process_run(self) -> bool:
+        with self._lock:
+            if self._runs <= 0:
+                return False
+            self._runs -= 1
+            return True
+
+    def _take_session_run(self) -> bool:
+        if self.token:
+            supplied = st.query_params.get(PROFILE_PARAM)
+            if supplied is not None:
+                # Drop the token from the address bar either way
+                del st.query_params[PROFILE_PARAM]
+                if hmac.compare_digest(supplied, self.token):
+                    st.session_state[_RUNS_KEY] = self.session_runs
+        left = st.session_state.get(_RUNS_KEY, 0)
+        if left <= 0:
+            return False
+        st.session_state[_RUNS_KEY] = left - 1
+        return True
+
+    def profile_run(self) -> SampledRun | None:
+        """Profile the calling script run if profiling is armed.
+
+        Call at module level of the script, before anything worth profiling.
+        """
+        if not self.enabled:
+            return None
+        # Widget values of this run, to name the change that triggered it
+        inputs = _widget_values()
+        previous = st.session_state.get(_INPUTS_KEY)
+        st.session_state[_INPUTS_KEY] = inputs
+        if not (self._take_session_run() or self._take_process_run()):
+            return None
+
+        if previous is None:
+            trigger = "load"
+        else:
+            changed = sorted(key for key, value in inputs.items() if key in previous and previous[key] != value)
+            trigger = "+".join(changed) or "rerun"
+        ctx = get_script_run_ctx(suppress_warning=True)
+        session = ctx.session_id if ctx is not None else "bare"
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+        name = _UNSAFE.sub("_", f"{stamp}-{session[:8]}-{trigger}")[:160]
+        return SampledRun(sys._getframe(1), self.directory / f"{name}.collapsed", self.interval)
+
+    def finish_run(self) -> None:
+        """Keep the widget values the calling script run ended with.
+
+        Call at the end of the script. Widgets are created during a run, so
+        the values seen when the next run starts would miss those first
+        created by this one, and the session's first change be named
+        ``rerun``.
+        """
+        if self.enabled:
+            st.session_state[_INPUTS_KEY] = _widget_values()
+
+
+def _widget_values() -> dict:
+    return {key: st.session_state[key] for key in st.session_state if not key.startswith("_")}
+
+
+@st.cache_resource(show_spinner=False)
+def load_profiler() -> Profiler:
+    """Return the process-wide profiler."""
+    return Profiler()
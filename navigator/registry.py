@@ -0,0 +1,311 @@
+"""Location registry.
+
+Every campus place is loaded from ``data/locations.json`` and shared by all
+sessions. Lookups by id, name, category and kind are precomputed, so ids and
+names (ignoring case) must be unique. The JSON sent to the navigator is
+serialized once and tagged with a content hash.
+
+The file is watched: ``RegistryWatcher`` polls it and, when it changes, loads
+the new registry, diffs it against the current one by place id and hands the
+changes to its subscribers (the search, spatial and distance indexes and the
+router), which patch only the affected entries. Script runs pick up the new
+registry on their next call to ``load_registry``; no restart is needed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple, Protocol, TypeVar
+
+import streamlit as st
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "locations.json"
+
+# Seconds between two checks of the locations file; 0 disables watching
+RELOAD_INTERVAL = float(os.environ.get("NAVIGATOR_RELOAD_INTERVAL", "1") or 0)
+
+_log = logging.getLogger(__name__)
+
+
+class Place(NamedTuple):
+    """One campus location.
+
+    ``category`` is the section it is listed under; ``kind`` says what it is
+    (``"atm"``, ``"canteen"``, ``"hostel"``...), case-folded, for
+    nearest-of-a-kind queries.
+    """
+
+    id: str
+    name: str
+    category: str
+    lat: float
+    lng: float
+    url: str
+    description: str = ""
+    kind: str = ""
+
+
+class Category(NamedTuple):
+    """A place category and the label shown above its section."""
+
+    name: str
+    label: str
+
+
+class LocationRegistry:
+    """Indexed, read-only collection of campus places."""
+
+    def __init__(self, categories: list[Category], places: list[Place]) -> None:
+        self.categories = tuple(categories)
+        self.places = tuple(places)
+
+        self._category_index = {category.name: i for i, category in enumerate(self.categories)}
+        self.by_id: dict[str, Place] = {}
+        self.by_name: dict[str, Place] = {}
+
+        grouped: dict[str, list[Place]] = {category.name: [] for category in self.categories}
+        kinds: dict[str, list[Place]] = {}
+        for place in self.places:
+            if place.id in self.by_id:
+                raise ValueError(f"Duplicate place id: {place.id!r}")
+            if place.category not in grouped:
+                raise ValueError(f"Place {place.id!r} has unknown category {place.category!r}")
+            name = place.name.casefold()
+            if name in self.by_name:
+                raise ValueError(f"Place {place.id!r} has the same name as {self.by_name[name].id!r}: {place.name!r}")
+            self.by_id[place.id] = place
+            self.by_name[name] = place
+            grouped[place.category].append(place)
+            if place.kind:
+                kinds.setdefault(place.kind, []).append(place)
+        self.by_category: dict[str, tuple[Place, ...]] = {
+            name: tuple(items) for name, items in grouped.items()
+        }
+        self.by_kind: dict[str, tuple[Place, ...]] = {kind: tuple(items) for kind, items in kinds.items()}
+
+    @classmethod
+    def from_file(cls, path: Path = DATA_PATH) -> "LocationRegistry":
+        """Load a registry from a locations JSON file."""
+        raw = json.loads(Path(path).read_text(encoding="utf-8"))
+        categories = [Category(c["name"], c["label"]) for c in raw["categories"]]
+        places = [
+            Place(
+                id=p["id"],
+                name=p["name"],
+                category=p["category"],
+                lat=float(p["lat"]),
+                lng=float(p["lng"]),
+                url=p["url"],
+                description=p.get("description", ""),
+                kind=p.get("kind", "").casefold(),
+            )
+            for p in raw["places"]
+        ]
+        return cls(categories, places)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def __iter__(self) -> Iterator[Place]:
+        return iter(self.places)
+
+    def __contains__(self, place_id: object) -> bool:
+        return place_id in self.by_id
+
+    def get(self, name: str) -> Place | None:
+        """Look up a place by its display name, ignoring case."""
+        return self.by_name.get(name.casefold())
+
+    def in_category(self, category: str) -> tuple[Place, ...]:
+        """Return the places in a category, in registry order."""
+        return self.by_category.get(category, ())
+
+    def of_kind(self, kind: str) -> tuple[Place, ...]:
+        """Return the places of a kind, in registry order."""
+        return self.by_kind.get(kind, ())
+
+    def category_count(self) -> int:
+        """Return the number of categories that contain at least one place."""
+        return sum(1 for items in self.by_category.values() if items)
+
+    def to_client(self) -> dict:
+        """Return the compact structure the navigator component expects.
+
+        Places are positional records ``[id, name, category index, lat, lng,
+        url, description]`` so the payload stays small for large registries.
+        """
+        return {
+            "version": self.version,
+            "categories": [[c.name, c.label] for c in self.categories],
+            "places": [
+                [p.id, p.name, self._category_index[p.category], p.lat, p.lng, p.url, p.description]
+                for p in self.places
+            ],
+        }
+
+    @cached_property
+    def _payload(self) -> str:
+        body = {
+            "categories": [[c.name, c.label] for c in self.categories],
+            "places": [list(p) for p in self.places],
+        }
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+    @cached_property
+    def version(self) -> str:
+        """Content hash of the registry, stable across processes."""
+        return hashlib.sha256(self._payload.encode("utf-8")).hexdigest()[:16]
+
+    @cached_property
+    def client_json(self) -> str:
+        """Client payload serialized once, safe to embed inside a ``<script>``."""
+        text = json.dumps(self.to_client(), ensure_ascii=False, separators=(",", ":"))
+        return text.replace("</", "<\\/")
+
+
+class RegistryChanges(NamedTuple):
+    """Places that differ between two registries, matched by id."""
+
+    added: tuple[Place, ...]
+    removed: tuple[Place, ...]
+    # New records of places present in both with different fields
+    changed: tuple[Place, ...]
+    # The changed places whose coordinates or category differ
+    moved: tuple[Place, ...]
+
+    @property
+    def upserted(self) -> tuple[Place, ...]:
+        """New records of the added and changed places."""
+        return self.added + self.changed
+
+
+def diff_registries(old: LocationRegistry, new: LocationRegistry) -> RegistryChanges:
+    """Places added, removed and changed from ``old`` to ``new``."""
+    added = []
+    changed = []
+    moved = []
+    for place in new.places:
+        previous = old.by_id.get(place.id)
+        if previous is None:
+            added.append(place)
+        elif previous != place:
+            changed.append(place)
+            if (previous.lat, previous.lng, previous.category) != (place.lat, place.lng, place.category):
+                moved.append(place)
+    removed = tuple(place for place in old.places if place.id not in new.by_id)
+    return RegistryChanges(tuple(added), removed, tuple(changed), tuple(moved))
+
+
+class Subscriber(Protocol):
+    """An index kept in step with the registry by ``RegistryWatcher``."""
+
+    def apply_changes(self, changes: RegistryChanges, registry: LocationRegistry) -> None: ...
+
+
+S = TypeVar("S", bound=Subscriber)
+
+
+class RegistryWatcher:
+    """The registry of a locations file, reloaded when the file changes.
+
+    A daemon thread compares the file's modification time and size every
+    ``interval`` seconds. A changed file is loaded and diffed against the
+    current registry; every subscriber applies the changes before the new
+    registry is published, so a script run never sees a registry newer than
+    its indexes. A file that fails to load, such as one caught half written,
+    is logged and the current registry kept until the next change.
+
+    The registry each subscriber was last brought to is tracked. When a
+    subscriber fails, the new registry is not published and the file is
+    checked again on the next poll: subscribers that already applied it are
+    skipped, and the others get their changes again.
+    """
+
+    def __init__(self, path: Path = DATA_PATH, interval: float = RELOAD_INTERVAL) -> None:
+        self.path = Path(path)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stamp = self._stat()
+        self.registry = LocationRegistry.from_file(self.path)
+        self._subscribers: list[Subscriber] = []
+        # Registry each subscriber has applied, by position in _subscribers
+        self._synced: list[LocationRegistry] = []
+        if interval > 0:
+            threading.Thread(target=self._watch, name="navigator-registry-watcher", daemon=True).start()
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                _log.exception("Could not apply the changes to %s; retrying", self.path)
+
+    def subscribe(self, build: Callable[[LocationRegistry], S]) -> S:
+        """Build a subscriber from the current registry and keep it up to date."""
+        with self._lock:
+            subscriber = build(self.registry)
+            self._subscribers.append(subscriber)
+            self._synced.append(self.registry)
+        return subscriber
+
+    def check(self) -> RegistryChanges | None:
+        """Reload the file if it changed since the last check and return the changes.
+
+        Exceptions of subscribers are raised once the subscribers before them
+        are updated; the file counts as unchanged, so the next check retries.
+        """
+        with self._lock:
+            stamp = self._stat()
+            if stamp is None or stamp == self._stamp:
+                return None
+            try:
+                registry = LocationRegistry.from_file(self.path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self._stamp = stamp
+                _log.warning("Keeping the current places; %s does not load: %s", self.path, e)
+                return None
+            changes = diff_registries(self.registry, registry)
+            for i, subscriber in enumerate(self._subscribers):
+                synced = self._synced[i]
+                if synced.version != registry.version:
+                    subscriber.apply_changes(
+                        changes if synced is self.registry else diff_registries(synced, registry), registry
+                    )
+                    self._synced[i] = registry
+            self._stamp = stamp
+            if registry.version == self.registry.version:
+                return None
+            self.registry = registry
+        _log.info(
+            "Reloaded %s: %d added, %d changed, %d removed, version %s",
+            self.path,
+            len(changes.added),
+            len(changes.changed),
+            len(changes.removed),
+            registry.version,
+        )
+        return changes
+
+
+@st.cache_resource(show_spinner=False)
+def load_registry_watcher() -> RegistryWatcher:
+    """Return the process-wide watcher of ``data/locations.json``."""
+    return RegistryWatcher(DATA_PATH)
+
+
+def load_registry() -> LocationRegistry:
+    """Return the current registry of ``data/locations.json``."""
+    return load_registry_watcher().registry
@@ -0,0 +1,363 @@
+"""Precomputed routes to every registered place, persisted on disk.
+
+For each place and travel mode a shortest-path tree is grown backwards from
+the place's graph node, which gives the fastest time, path length and next hop
+from *every* node to that place. Routing any snapped origin to a known place
+is then an array lookup plus a walk along next hops, with no graph search.
+
+The arrays are written as ``.npy`` files into a directory named after the
+graph version and destination set, and memory-mapped read-only at startup.
+When the graph or the place set changes, the previous table is reused and
+only the trees touched by the change are regrown:
+
+* a removed or lengthened arc ``u -> v`` matters to a tree whose next hop
+  from ``u`` is ``v``;
+* an added or shortened arc matters to a tree it would shortcut, i.e. when
+  ``cost(u -> v) + time[v] < time[u]``.
+
+Build ahead of deployment with ``python -m navigator.route_cache``.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from navigator.routing import MODES, CampusGraph, travel_minutes
+
+CACHE_DIR = Path(
+    os.environ.get(
+        "NAVIGATOR_ROUTE_CACHE",
+        Path(__file__).resolve().parent.parent / ".cache" / "routes",
+    )
+)
+
+# Older table directories kept next to the current one
+KEEP_TABLES = 2
+
+UNREACHABLE = -1
+
+
+class RouteTable:
+    """Shortest-path trees towards every registered place, for every mode.
+
+    ``minutes``, ``length_km`` and ``next_hop`` have shape
+    ``(len(MODES), places, nodes)``; ``next_hop`` is ``UNREACHABLE`` where a
+    node cannot reach the place and the node itself at the destination.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        graph_version: str,
+        node_ids: list[str],
+        destinations: dict[str, str],
+        arcs: list[list],
+        minutes: np.ndarray,
+        length_km: np.ndarray,
+        next_hop: np.ndarray,
+    ) -> None:
+        self.key = key
+        self.graph_version = graph_version
+        self.node_ids = node_ids
+        self.destinations = destinations
+        self.arcs = arcs
+        self.minutes = minutes
+        self.length_km = length_km
+        self.next_hop = next_hop
+        self._row = {place_id: i for i, place_id in enumerate(destinations)}
+
+    def __contains__(self, place_id: object) -> bool:
+        return place_id in self._row
+
+    def row_of(self, place_id: str) -> int | None:
+        """Return the table row of a place, or ``None`` if it has none."""
+        return self._row.get(place_id)
+
+    def lookup(self, start: int, place_id: str, mode: str) -> tuple[list[int], float, float] | None:
+        """Route from node ``start`` to a place as ``(node path, km, minutes)``.
+
+        Returns ``None`` when the place is not in the table or unreachable.
+        """
+        row = self._row.get(place_id)
+        if row is None:
+            return None
+        m = MODES.index(mode)
+        hops = self.next_hop[m, row]
+        if hops[start] == UNREACHABLE:
+            return None
+        path = [start]
+        while hops[path[-1]] != path[-1]:
+            path.append(int(hops[path[-1]]))
+        return path, float(self.length_km[m, row, start]), float(self.minutes[m, row, start])
+
+    def save(self, directory: Path) -> None:
+        """Write the table into ``directory`` (which must not exist yet)."""
+        directory.mkdir(parents=True)
+        np.save(directory / "minutes.npy", np.ascontiguousarray(self.minutes))
+        np.save(directory / "length_km.npy", np.ascontiguousarray(self.length_km))
+        np.save(directory / "next_hop.npy", np.ascontiguousarray(self.next_hop))
+        meta = {
+            "key": self.key,
+            "graph_version": self.graph_version,
+            "modes": list(MODES),
+            "nodes": self.node_ids,
+            "destinations": self.destinations,
+            "arcs": self.arcs,
+        }
+        (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def open(cls, directory: Path) -> "RouteTable | None":
+        """Memory-map a saved table, or return ``None`` if it is missing or stale."""
+        try:
+            meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            if meta.get("modes") != list(MODES):
+                return None
+            arrays = [
+                np.load(directory / f"{name}.npy", mmap_mode="r")
+                for name in ("minutes", "length_km", "next_hop")
+            ]
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(
+            meta["key"],
+            meta["graph_version"],
+            meta["nodes"],
+            meta["destinations"],
+            meta["arcs"],
+            *arrays,
+        )
+
+
+def table_key(graph: CampusGraph, destinations: dict[str, int]) -> str:
+    """Identify a table by graph version and destination node of every place."""
+    digest = hashlib.sha256(graph.version.encode("utf-8"))
+    for place_id, node in sorted(destinations.items()):
+        digest.update(f"\0{place_id}\0{graph.nodes[node].id}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _arc_list(graph: CampusGraph) -> list[list]:
+    ids = [node.id for node in graph.nodes]
+    return [[ids[a], ids[b], kind, length_km] for a, b, kind, length_km in graph.arcs()]
+
+
+def _reverse_adjacency(graph: CampusGraph, mode: str) -> list[list[tuple[int, float, float]]]:
+    reverse: list[list[tuple[int, float, float]]] = [[] for _ in graph.nodes]
+    for a, b, kind, length_km in graph.arcs():
+        reverse[b].append((a, travel_minutes(length_km, kind, mode), length_km))
+    return reverse
+
+
+def _grow_tree(reverse, target: int, minutes, length_km, next_hop) -> None:
+    """Dijkstra from ``target`` over reversed arcs, filling one tree in place."""
+    minutes.fill(np.inf)
+    length_km.fill(np.inf)
+    next_hop.fill(UNREACHABLE)
+    minutes[target] = 0.0
+    length_km[target] = 0.0
+    next_hop[target] = target
+    best = {target: 0.0}
+    frontier = [(0.0, target)]
+    while frontier:
+        time, node = heapq.heappop(frontier)
+        if time > best[node]:
+            continue
+        for source, cost, km in reverse[node]:
+            candidate = time + cost
+            if candidate < best.get(source, np.inf):
+                best[source] = candidate
+                minutes[source] = candidate
+                length_km[source] = length_km[node] + km
+                next_hop[source] = node
+                heapq.heappush(frontier, (candidate, source))
+
+
+def build_table(
+    graph: CampusGraph,
+    destinations: dict[str, int],
+    previous: RouteTable | None = None,
+) -> tuple[RouteTable, int]:
+    """Compute a table, reusing every tree of ``previous`` the change left intact.
+
+    Returns the table and the number of trees that had to be grown.
+    """
+    node_ids = [node.id for node in graph.nodes]
+    places = list(destinations)
+    shape = (len(MODES), len(places), len(node_ids))
+    minutes = np.full(shape, np.inf, dtype=np.float32)
+    length_km = np.full(shape, np.inf, dtype=np.float32)
+    next_hop = np.full(shape, UNREACHABLE, dtype=np.int32)
+    arcs = _arc_list(graph)
+    stale = np.ones(shape[:2], dtype=bool)
+
+    if previous is not None:
+        stale = _carry_over(previous, node_ids, destinations, arcs, minutes, length_km, next_hop)
+
+    grown = 0
+    for m, mode in enumerate(MODES):
+        rows = np.flatnonzero(stale[m])
+        if not len(rows):
+            continue
+        reverse = _reverse_adjacency(graph, mode)
+        for row in rows:
+            target = destinations[places[row]]
+            _grow_tree(reverse, target, minutes[m, row], length_km[m, row], next_hop[m, row])
+            grown += 1
+
+    table = RouteTable(
+        table_key(graph, destinations),
+        graph.version,
+        node_ids,
+        {place_id: node_ids[node] for place_id, node in destinations.items()},
+        arcs,
+        minutes,
+        length_km,
+        next_hop,
+    )
+    return table, grown
+
+
+def _carry_over(previous, node_ids, destinations, arcs, minutes, length_km, next_hop) -> np.ndarray:
+    """Copy reusable trees from ``previous`` and return the mask of trees to regrow."""
+    new_index = {node_id: i for i, node_id in enumerate(node_ids)}
+    # Old node index -> new node index; the extra last slot maps UNREACHABLE
+    remap = np.full(len(previous.node_ids) + 1, UNREACHABLE, dtype=np.int32)
+    old_cols, new_cols = [], []
+    for old, node_id in enumerate(previous.node_ids):
+        new = new_index.get(node_id)
+        if new is not None:
+            remap[old] = new
+            old_cols.append(old)
+            new_cols.append(new)
+
+    stale = np.ones((len(MODES), len(destinations)), dtype=bool)
+    rows_new, rows_old = [], []
+    for row, (place_id, node) in enumerate(destinations.items()):
+        old_row = previous.row_of(place_id)
+        if old_row is not None and previous.destinations[place_id] == node_ids[node]:
+            rows_new.append(row)
+            rows_old.append(old_row)
+    if not rows_new:
+        return stale
+
+    rows_new = np.array(rows_new)
+    rows_old = np.array(rows_old)
+    old_cols = np.array(old_cols, dtype=np.intp)
+    new_cols = np.array(new_cols, dtype=np.intp)
+    for m in range(len(MODES)):
+        block = np.ix_(rows_new, new_cols)
+        source = np.ix_(rows_old, old_cols)
+        minutes[m][block] = previous.minutes[m][source]
+        length_km[m][block] = previous.length_km[m][source]
+        next_hop[m][block] = remap[previous.next_hop[m][source]]
+        stale[m, rows_new] = False
+
+    old_index = {node_id: i for i, node_id in enumerate(previous.node_ids)}
+    old_arcs = _shortest_arcs(previous.arcs)
+    new_arcs = _shortest_arcs(arcs)
+    for m, mode in enumerate(MODES):
+        for (a, b, kind), km in old_arcs.items():
+            if new_arcs.get((a, b, kind), np.inf) <= km:
+                continue
+            # Removed or lengthened: stale where the tree steps from a to b
+            if a in new_index and b in new_index:
+                stale[m] |= next_hop[m, :, new_index[a]] == new_index[b]
+            else:
+                # A node disappeared with the arc, so check the old tree instead
+                stale[m, rows_new] |= (
+                    previous.next_hop[m, rows_old, old_index[a]] == old_index[b]
+                )
+        for (a, b, kind), km in new_arcs.items():
+            if old_arcs.get((a, b, kind), np.inf) <= km:
+                continue
+            # Added or shortened: stale where it would shortcut the tree
+            cost = travel_minutes(km, kind, mode)
+            ia, ib = new_index[a], new_index[b]
+            stale[m] |= cost + minutes[m, :, ib] < minutes[m, :, ia] - 1e-6
+    return stale
+
+
+def _shortest_arcs(arcs: list[list]) -> dict[tuple[str, str, str], float]:
+    # Parallel arcs of one kind: only the shortest can be on a shortest path
+    shortest: dict[tuple[str, str, str], float] = {}
+    for a, b, kind, km in arcs:
+        key = (a, b, kind)
+        shortest[key] = min(km, shortest.get(key, km))
+    return shortest
+
+
+def load_route_table(
+    graph: CampusGraph,
+    destinations: dict[str, int],
+    cache_dir: Path = CACHE_DIR,
+) -> RouteTable:
+    """Open the table for this graph and place set, building it if needed.
+
+    A missing table is derived incrementally from the newest table on disk.
+    Tables are written to a temporary directory and renamed into place, so
+    concurrent server processes never see a partial table.
+    """
+    key = table_key(graph, destinations)
+    directory = cache_dir / key
+    table = RouteTable.open(directory)
+    if table is not None:
+        return table
+
+    previous = None
+    if cache_dir.is_dir():
+        candidates = sorted(
+            (d for d in cache_dir.iterdir() if d.is_dir() and not d.name.startswith(".")),
+            key=lambda d: d.stat().st_mtime,
+            reverse=True,
+        )
+        for candidate in candidates:
+            previous = RouteTable.open(candidate)
+            if previous is not None:
+                break
+
+    table, _ = build_table(graph, destinations, previous)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".build-", dir=cache_dir))
+    try:
+        table.save(staging / "table")
+        try:
+            (staging / "table").rename(directory)
+        except OSError:
+            pass  # Another process published the same table first
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    _prune(cache_dir, keep=directory)
+    return RouteTable.open(directory) or table
+
+
+def _prune(cache_dir: Path, keep: Path) -> None:
+    tables = sorted(
+        (d for d in cache_dir.iterdir() if d.is_dir() and d != keep and not d.name.startswith(".")),
+        key=lambda d: d.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in tables[KEEP_TABLES - 1 :]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def main() -> None:
+    """Precompute the route table for the current registry and graph."""
+    from navigator.registry import LocationRegistry
+    from navigator.routing import Router
+
+    registry = LocationRegistry.from_file()
+    router = Router(CampusGraph.from_file(), registry)
+    destinations = router.destinations()
+    table = load_route_table(router.graph, destinations)
+    print(f"Route table {table.key}: {len(destinations)} places x {len(table.node_ids)} nodes in {CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Offline routing over the campus path network.
+
+The walkway and road graph is loaded from ``data/paths.json``. Routes are
+found with A* using a haversine heuristic, so no external service is needed
+to get the real path length and ETA. Edges are weighted by travel time: when
+driving, roads are taken at driving speed and the last stretch on walkways is
+walked. Results are cached per origin cell and destination, so repeated taps
+from roughly the same spot cost one dictionary lookup.
+
+Places whose id is also a graph node are routed to that node; other places
+are snapped to the nearest node. Origins and places farther than
+``MAX_SNAP_KM`` from every node are off the network and get no route. When the registry changes, only the cached
+routes to places that moved or left are dropped.
+"""
+
+import hashlib
+import heapq
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import streamlit as st
+
+from navigator.distance import DRIVING_KMH, WALKING_KMH
+from navigator.geo import haversine_km
+from navigator.registry import LocationRegistry, Place, RegistryChanges, load_registry_watcher
+from navigator.spatial import SpatialIndex
+
+GRAPH_PATH = Path(__file__).resolve().parent.parent / "data" / "paths.json"
+
+MODES = ("walking", "driving")
+EDGE_KINDS = ("walkway", "road")
+# Farthest a route origin or destination place may be from the nearest node;
+# beyond it the point is off the network and no route is given
+MAX_SNAP_KM = 0.5
+
+
+class Node(NamedTuple):
+    """A graph vertex. ``category`` is ``"road"`` if a car can reach it."""
+
+    id: str
+    lat: float
+    lng: float
+    category: str
+
+
+class Edge(NamedTuple):
+    """A directed adjacency entry."""
+
+    to: int
+    length_km: float
+    kind: str
+
+
+class Route(NamedTuple):
+    """A computed route; ``path`` is the ``(lat, lng)`` polyline from origin to destination."""
+
+    mode: str
+    destination: str
+    path: list[tuple[float, float]]
+    nodes: list[str]
+    length_km: float
+    eta_min: float
+
+
+def _speed_kmh(kind: str, mode: str) -> float:
+    if mode == "driving" and kind == "road":
+        return DRIVING_KMH
+    return WALKING_KMH
+
+
+def travel_minutes(length_km: float, kind: str, mode: str) -> float:
+    """Minutes to cover an edge of ``kind`` in ``mode``."""
+    return length_km / _speed_kmh(kind, mode) * 60.0
+
+
+class CampusGraph:
+    """Adjacency-list graph of campus walkways and roads."""
+
+    def __init__(
+        self,
+        nodes: list[tuple[str, float, float]],
+        edges: list[dict],
+        version: str = "",
+    ) -> None:
+        self.version = version
+        self.node_index: dict[str, int] = {}
+        coords = []
+        for node_id, lat, lng in nodes:
+            if node_id in self.node_index:
+                raise ValueError(f"Duplicate node id: {node_id!r}")
+            self.node_index[node_id] = len(coords)
+            coords.append((node_id, float(lat), float(lng)))
+
+        self.adjacency: list[list[Edge]] = [[] for _ in coords]
+        has_road = [False] * len(coords)
+        for edge in edges:
+            kind = edge.get("kind", "walkway")
+            if kind not in EDGE_KINDS:
+                raise ValueError(f"Unknown edge kind: {kind!r}")
+            a = self.node_index[edge["from"]]
+            b = self.node_index[edge["to"]]
+            length_km = edge.get("length_m")
+            if length_km is None:
+                length_km = haversine_km(coords[a][1], coords[a][2], coords[b][1], coords[b][2])
+            else:
+                length_km = float(length_km) / 1000.0
+            self.adjacency[a].append(Edge(b, length_km, kind))
+            if not edge.get("oneway", False):
+                self.adjacency[b].append(Edge(a, length_km, kind))
+            if kind == "road":
+                has_road[a] = has_road[b] = True
+
+        self.nodes = [
+            Node(node_id, lat, lng, "road" if road else "walkway")
+            for (node_id, lat, lng), road in zip(coords, has_road)
+        ]
+        self._snap_index = SpatialIndex(self.nodes, cell_m=25.0)
+
+    @classmethod
+    def from_file(cls, path: Path = GRAPH_PATH) -> "CampusGraph":
+        """Load a graph from a paths JSON file."""
+        text = Path(path).read_text(encoding="utf-8")
+        raw = json.loads(text)
+        return cls(
+            [(n["id"], n["lat"], n["lng"]) for n in raw["nodes"]],
+            raw["edges"],
+            version=hashlib.sha256(text.encode("utf-8")).hexdigest()[:16],
+        )
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def arcs(self) -> Iterator[tuple[int, int, str, float]]:
+        """Yield every directed arc as ``(from index, to index, kind, length_km)``."""
+        for a, edges in enumerate(self.adjacency):
+            for edge in edges:
+                yield a, edge.to, edge.kind, edge.length_km
+
+    def snap(self, lat: float, lng: float, mode: str = "walking", max_km: float = MAX_SNAP_KM) -> int | None:
+        """Return the index of the nearest node usable in ``mode``, or ``None`` if none is within ``max_km``."""
+        category = "road" if mode == "driving" else None
+        found = self._snap_index.nearest(lat, lng, n=1, category=category, max_km=max_km)
+        if not found and category is not None:
+            found = self._snap_index.nearest(lat, lng, n=1, max_km=max_km)
+        return self.node_index[found[0][0].id] if found else None
+
+    def cell_of(self, lat: float, lng: float) -> tuple[int, int]:
+        """Return the 25 m grid cell of a point, used as the route cache key."""
+        return self._snap_index.cell_of(lat, lng)
+
+    def astar(
+        self, start: int, goal: int, mode: str = "walking"
+    ) -> tuple[list[int], float, float] | None:
+        """Fastest path from ``start`` to ``goal``.
+
+        Returns ``(node indices, length in km, minutes)`` or ``None`` when the
+        goal is unreachable.
+        """
+        nodes = self.nodes
+        goal_node = nodes[goal]
+        top_speed = DRIVING_KMH if mode == "driving" else WALKING_KMH
+
+        def heuristic(i: int) -> float:
+            node = nodes[i]
+            return haversine_km(node.lat, node.lng, goal_node.lat, goal_node.lng) / top_speed * 60.0
+
+        best_min = {start: 0.0}
+        length = {start: 0.0}
+        parent: dict[int, int] = {}
+        frontier = [(heuristic(start), 0.0, start)]
+        while frontier:
+            _, minutes, current = heapq.heappop(frontier)
+            if current == goal:
+                path = [goal]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path, length[goal], minutes
+            if minutes > best_min[current]:
+                continue
+            for edge in self.adjacency[current]:
+                candidate = minutes + travel_minutes(edge.length_km, edge.kind, mode)
+                if candidate < best_min.get(edge.to, float("inf")):
+                    best_min[edge.to] = candidate
+                    length[edge.to] = length[current] + edge.length_km
+                    parent[edge.to] = current
+                    heapq.heappush(frontier, (candidate + heuristic(edge.to), candidate, edge.to))
+        return None
+
+
+_MISS = object()
+
+
+class Router:
+    """Routes from an arbitrary point to a registered place, with an LRU cache."""
+
+    def __init__(
+        self,
+        graph: CampusGraph,
+        registry: LocationRegistry,
+        cache_size: int = 4096,
+        table=None,
+    ) -> None:
+        self.graph = graph
+        self.registry = registry
+        # Optional precomputed ``RouteTable`` for this graph (see route_cache)
+        self.table = table
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, tuple[int, list[int], float, float] | None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def destination_node(self, place_id: str) -> int | None:
+        """Graph node a place is routed to, or ``None`` if the place is off the network."""
+        return self._destination(self.registry.by_id[place_id])
+
+    def destinations(self, registry: LocationRegistry | None = None) -> dict[str, int]:
+        """Graph node of every place on the network, for a route table."""
+        destinations = {place.id: self._destination(place) for place in registry or self.registry}
+        return {place_id: node for place_id, node in destinations.items() if node is not None}
+
+    def _destination(self, place: Place) -> int | None:
+        index = self.graph.node_index.get(place.id)
+        if index is not None:
+            return index
+        return self.graph.snap(place.lat, place.lng)
+
+    def apply_changes(self, changes: RegistryChanges, registry: LocationRegistry) -> None:
+        """Follow a registry change, dropping cached routes to places that moved or left.
+
+        A route table is replaced by one for the new destinations, which
+        ``route_cache`` derives from the current table: only the rows of
+        places added or moved to another node are computed.
+        """
+        table = self.table
+        if table is not None and (changes.added or changes.removed or changes.moved):
+            from navigator.route_cache import load_route_table  # route_cache imports this module
+
+            table = load_route_table(self.graph, self.destinations(registry))
+        stale = {place.id for place in changes.removed + changes.moved}
+        with self._lock:
+            self.registry = registry
+            self.table = table
+            for key in [key for key in self._cache if key[1] in stale]:
+                del self._cache[key]
+
+    def route(self, lat: float, lng: float, place_id: str, mode: str = "walking") -> Route | None:
+        """Route from a point to a place, or ``None`` if either is off the network or unreachable.
+
+        Raises ``KeyError`` for unknown places and ``ValueError`` for unknown modes.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode!r}")
+        place = self.registry.by_id[place_id]
+
+        key = (self.graph.cell_of(lat, lng), place_id, mode)
+        with self._lock:
+            cached = self._cache.get(key, _MISS)
+            if cached is not _MISS:
+                self._cache.move_to_end(key)
+        if cached is _MISS:
+            cached = self._solve(lat, lng, place_id, mode)
+            with self._lock:
+                self._cache[key] = cached
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if cached is None:
+            return None
+
+        start, path, length_km, minutes = cached
+        nodes = self.graph.nodes
+        # The leg from the exact origin to the snapped node is not cached
+        first = nodes[start]
+        lead_km = haversine_km(lat, lng, first.lat, first.lng)
+        lead_speed = DRIVING_KMH if mode == "driving" and first.category == "road" else WALKING_KMH
+        polyline = [(lat, lng)] + [(nodes[i].lat, nodes[i].lng) for i in path]
+        if polyline[-1] != (place.lat, place.lng):
+            polyline.append((place.lat, place.lng))
+        return Route(
+            mode=mode,
+            destination=place_id,
+            path=polyline,
+            nodes=[nodes[i].id for i in path],
+            length_km=lead_km + length_km,
+            eta_min=lead_km / lead_speed * 60.0 + minutes,
+        )
+
+    def _solve(self, lat: float, lng: float, place_id: str, mode: str):
+        start = self.graph.snap(lat, lng, mode)
+        goal = self.destination_node(place_id)
+        if start is None or goal is None:
+            return None
+        if self.table is not None and place_id in self.table:
+            found = self.table.lookup(start, place_id, mode)
+        else:
+            found = self.graph.astar(start, goal, mode)
+        if found is None:
+            return None
+        path, length_km, minutes = found
+        return start, path, length_km, minutes
+
+    def clear(self) -> None:
+        """Drop every cached route."""
+        with self._lock:
+            self._cache.clear()
+
+
+def _build_router(registry: LocationRegistry) -> Router:
+    from navigator.route_cache import load_route_table  # route_cache imports this module
+
+    router = Router(CampusGraph.from_file(GRAPH_PATH), registry)
+    router.table = load_route_table(router.graph, router.destinations())
+    return router
+
+
+@st.cache_resource(show_spinner=False)
+def load_router() -> Router:
+    """Return the process-wide router over ``data/paths.json``, kept in step with the registry.
+
+    Routes to registered places come from the memory-mapped route table.
+    """
+    return load_registry_watcher().subscribe(_build_router)
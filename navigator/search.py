@@ -0,0 +1,251 @@
+"""Search index for the place list.
+
+Names, categories and descriptions are tokenized into an inverted index.
+Query terms match tokens exactly, as a prefix (through a character trie) or,
+for typos, fuzzily: candidate tokens come from a trigram index and are kept
+when their edit distance is small enough ("libary" -> "library"). Every term
+must match for a place to be returned, and results are ranked by score.
+
+The navigator's engine builds the same token list, postings, trie and
+trigram index in JavaScript from the places it holds, with the same rules, so
+the client and ``SearchIndex.search`` return the same ranking.
+
+When the registry changes, only the documents of the places that changed are
+re-tokenized. Tokens left without postings stay in the trie and trigram index,
+where they match nothing.
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Iterable
+
+import streamlit as st
+
+from navigator.registry import LocationRegistry, Place, RegistryChanges, load_registry_watcher
+
+# Field order in postings; a hit in the name counts for more
+FIELDS = ("name", "category", "description")
+FIELD_WEIGHTS = (3.0, 1.5, 1.0)
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.6  # plus up to 0.4 for how much of the token the prefix covers
+FUZZY_SCORE = 0.5  # times the trigram similarity
+
+# Terms shorter than this are never matched fuzzily
+FUZZY_MIN_LENGTH = 4
+# Minimum Dice similarity of trigram sets before checking edit distance
+FUZZY_MIN_SIMILARITY = 0.3
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric tokens of ``text``."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token: str) -> set[str]:
+    """Padded character trigrams of a token."""
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(term: str) -> int:
+    """Typos tolerated in a term of this length."""
+    return 1 if len(term) < 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class _TrieNode:
+    __slots__ = ("children", "tokens")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        # Ids of every token in this subtree, for prefix lookups
+        self.tokens: list[int] = []
+
+
+class SearchIndex:
+    """Ranked place search with prefix and typo-tolerant matching."""
+
+    def __init__(self, places: Iterable[Place]) -> None:
+        # Place id per document, None for a slot freed by a removal
+        self.ids: list[str | None] = []
+        self.tokens: list[str] = []
+        self._token_ids: dict[str, int] = {}
+        # token id -> {doc: best field}
+        self._postings: list[dict[int, int]] = []
+        self._trie = _TrieNode()
+        self._trigrams: dict[str, list[int]] = {}
+        self._docs: dict[str, int] = {}
+        self._doc_tokens: list[tuple[int, ...]] = []
+        self._free: list[int] = []
+        # Documents in registry order, and the registry position of each; ties
+        # rank in registry order, as in the navigator's engine
+        self._order: list[int] = []
+        self._positions: list[int] = []
+        self._lock = threading.Lock()
+        for place in places:
+            self._add_document(place)
+        self._order = list(range(len(self.ids)))
+        self._positions = list(self._order)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _token_id(self, token: str) -> int:
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self._token_ids[token] = token_id
+            self.tokens.append(token)
+            self._postings.append({})
+            node = self._trie
+            node.tokens.append(token_id)
+            for char in token:
+                node = node.children.setdefault(char, _TrieNode())
+                node.tokens.append(token_id)
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, []).append(token_id)
+        return token_id
+
+    def _add_document(self, place: Place) -> None:
+        if self._free:
+            doc = self._free.pop()
+            self.ids[doc] = place.id
+        else:
+            doc = len(self.ids)
+            self.ids.append(place.id)
+            self._doc_tokens.append(())
+        self._docs[place.id] = doc
+        token_ids = []
+        for field, text in enumerate((place.name, place.category, place.description)):
+            for token in tokenize(text):
+                token_id = self._token_id(token)
+                postings = self._postings[token_id]
+                # Keep the highest-weighted field (lowest index) per document
+                if field < postings.get(doc, len(FIELDS)):
+                    if doc not in postings:
+                        token_ids.append(token_id)
+                    postings[doc] = field
+        self._doc_tokens[doc] = tuple(token_ids)
+
+    def _remove_document(self, place_id: str) -> None:
+        doc = self._docs.pop(place_id)
+        for token_id in self._doc_tokens[doc]:
+            del self._postings[token_id][doc]
+        self._doc_tokens[doc] = ()
+        self.ids[doc] = None
+        self._free.append(doc)
+
+    def apply_changes(self, changes: RegistryChanges, registry: LocationRegistry) -> None:
+        """Re-index the places that changed and follow the order of ``registry``.
+
+        Changes the index already holds, as when a failed reload is retried,
+        are applied again without error.
+        """
+        with self._lock:
+            for place in changes.removed + changes.upserted:
+                if place.id in self._docs:
+                    self._remove_document(place.id)
+            for place in changes.upserted:
+                self._add_document(place)
+            self._order = [self._docs[place.id] for place in registry.places]
+            self._positions = [0] * len(self.ids)
+            for position, doc in enumerate(self._order):
+                self._positions[doc] = position
+
+    def _term_matches(self, term: str) -> dict[int, float]:
+        """Token ids matching one query term, with their match score."""
+        matches: dict[int, float] = {}
+        node = self._trie
+        for char in term:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            for token_id in node.tokens:
+                token = self.tokens[token_id]
+                if len(token) == len(term):
+                    matches[token_id] = EXACT_SCORE
+                else:
+                    matches[token_id] = PREFIX_SCORE + 0.4 * len(term) / len(token)
+
+        if len(term) >= FUZZY_MIN_LENGTH:
+            grams = trigrams(term)
+            shared = Counter(t for gram in grams for t in self._trigrams.get(gram, ()))
+            limit = max_edits(term)
+            for token_id, count in shared.items():
+                if token_id in matches:
+                    continue
+                token = self.tokens[token_id]
+                similarity = 2 * count / (len(grams) + len(trigrams(token)))
+                if similarity < FUZZY_MIN_SIMILARITY:
+                    continue
+                if edit_distance(term, token, limit) <= limit:
+                    matches[token_id] = FUZZY_SCORE * similarity
+        return matches
+
+    def search(self, query: str, limit: int | None = None) -> list[tuple[int, float]]:
+        """Return ``(document index, score)`` pairs, best first.
+
+        Documents are numbered in registry order until the registry changes;
+        ``ids`` maps them to place ids. Equal scores rank in registry order,
+        and an empty query returns every place in registry order with score 0.
+        """
+        with self._lock:
+            return self._search(query, limit)
+
+    def _search(self, query: str, limit: int | None) -> list[tuple[int, float]]:
+        terms = tokenize(query)
+        if not terms:
+            hits = [(doc, 0.0) for doc in self._order]
+            return hits[:limit] if limit is not None else hits
+
+        scores: dict[int, float] | None = None
+        for term in dict.fromkeys(terms):
+            term_scores: dict[int, float] = {}
+            for token_id, score in self._term_matches(term).items():
+                for doc, field in self._postings[token_id].items():
+                    weighted = score * FIELD_WEIGHTS[field]
+                    if weighted > term_scores.get(doc, 0.0):
+                        term_scores[doc] = weighted
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: s + term_scores[doc] for doc, s in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+
+        positions = self._positions
+        ranked = sorted(scores.items(), key=lambda hit: (-hit[1], positions[hit[0]]))
+        return ranked[:limit] if limit is not None else ranked
+
+    def search_places(self, registry: LocationRegistry, query: str, limit: int | None = None) -> list[Place]:
+        """Convenience wrapper returning ``Place`` records."""
+        return [registry.by_id[self.ids[doc]] for doc, _ in self.search(query, limit)]
+
+
+@st.cache_resource(show_spinner=False)
+def load_search_index() -> SearchIndex:
+    """Return the process-wide search index, kept in step with the registry."""
+    return load_registry_watcher().subscribe(SearchIndex)
@@ -0,0 +1,262 @@
+"""Navigator component.
+
+The navigator is a bidirectional Streamlit component. Its CSS, markup,
+JavaScript and location data never change between reruns, so the page is
+compiled once per registry version into a build directory that Streamlit's
+component server serves. The sidebar settings reach the page as component
+arguments, and the page reports each navigation back as the component value.
+
+``frontend/index.html`` is written as one page. The build splits it into a
+stub of a few hundred bytes and minified assets named after their content:
+the stylesheet, the script (which also inserts the markup), the search and
+distance engine the script runs in a Web Worker, and the registry payload.
+Only the stub is revalidated on each load; unchanged assets stay in the
+browser cache across registry versions, and ``serve.py`` marks them
+immutable with ``ImmutableAssetsMiddleware``.
+
+The page keeps the payload in browser storage and only downloads it when it
+has no copy; a copy of an older version is brought up to date with a delta
+from ``/navigator/api/dataset`` (see ``navigator.dataset``). Every render
+also passes the current registry version, so a page mounted before
+``data/locations.json`` changed updates its places the same way, in place.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Mapping
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from navigator.dataset import load_dataset_archive
+from navigator.registry import LocationRegistry
+
+FRONTEND_DIR = Path(__file__).parent / "frontend"
+SHELL_PATH = FRONTEND_DIR / "index.html"
+
+BUILD_DIR = Path(
+    os.environ.get(
+        "NAVIGATOR_BUILD_DIR",
+        Path(__file__).resolve().parent.parent / ".cache" / "frontend",
+    )
+)
+
+# Older builds kept next to the current one, for server processes sharing
+# the build directory that have not reloaded the registry yet. A process
+# serves only its latest build; pages of an older one fetch the places of
+# their next render instead.
+KEEP_BUILDS = 2
+
+# Name Streamlit gives the component declared in this module
+COMPONENT_NAME = "navigator.shell.navigator"
+ASSETS_DIR = "assets"
+# Hex digits of the content hash in asset names
+HASH_LENGTH = 10
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# How the page reuses position fixes: a tap is answered at once from a fix
+# at most max_age_s old and accurate to max_accuracy_m, waits up to wait_s
+# for such a fix otherwise, then settles for one at most fallback_age_s old
+LOCATION_POLICY = {"max_age_s": 30.0, "max_accuracy_m": 50.0, "wait_s": 15.0, "fallback_age_s": 300.0}
+
+_ASSET_URL = re.compile(
+    rf"/component/{re.escape(COMPONENT_NAME)}/{ASSETS_DIR}/[\w-]+\.[0-9a-f]{{{HASH_LENGTH}}}\.(?:css|js|json)$"
+)
+
+STUB = (
+    '<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">'
+    '<meta name="viewport" content="width=device-width, initial-scale=1">'
+    '<link rel="stylesheet" href="{css}"></head>'
+    '<body><script src="{script}" data-version="{version}" data-places="{data}" data-worker="{worker}">'
+    "</script></body></html>"
+)
+
+
+def _part(html: str, pattern: str, what: str) -> str:
+    match = re.search(pattern, html, re.S)
+    if match is None:
+        raise ValueError(f"{SHELL_PATH} has no {what}")
+    return match.group(1)
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and whitespace that carries no meaning."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return css.replace(": ", ":").replace(";}", "}").strip()
+
+
+def minify_html(markup: str) -> str:
+    """Collapse whitespace runs, which render as a single space anyway."""
+    return re.sub(r"\s+", " ", markup).strip()
+
+
+def minify_js(script: str) -> str:
+    """Drop indentation, blank lines and ``//`` comment lines.
+
+    Line breaks are kept, so automatic semicolon insertion is unaffected, and
+    lines inside multi-line template literals are kept as they are.
+    """
+    lines = []
+    in_template = False
+    for line in script.splitlines():
+        stripped = line.strip()
+        if in_template:
+            lines.append(line)
+        elif stripped and not stripped.startswith("//"):
+            lines.append(stripped)
+        if line.count("`") % 2:
+            in_template = not in_template
+    return "\n".join(lines) + "\n"
+
+
+def _asset(name: str, ext: str, content: str) -> str:
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    return f"{ASSETS_DIR}/{name}.{digest}.{ext}"
+
+
+def places_asset(registry: LocationRegistry) -> str:
+    """Path of the registry payload in the build; the version already hashes its content."""
+    return f"{ASSETS_DIR}/places.{registry.version[:HASH_LENGTH]}.json"
+
+
+def compile_shell(registry: LocationRegistry) -> dict[str, str]:
+    """Return the files of the navigator page, keyed by path in the build directory."""
+    html = SHELL_PATH.read_text(encoding="utf-8")
+    css = _part(html, r"<style>(.*?)</style>", "<style> element")
+    markup = _part(html, r"<body>(.*?)<script>", "markup before the <script> element")
+    script = _part(html, r"<script>(.*?)</script>", "<script> element")
+    engine = _part(html, r'<script type="text/worker">(.*?)</script>', '<script type="text/worker"> element')
+
+    script = (
+        f"document.body.insertAdjacentHTML(\"afterbegin\", {json.dumps(minify_html(markup), ensure_ascii=False)});\n"
+        + minify_js(script)
+    )
+
+    # The registry is data, not code: the scripts' hashes only change with
+    # the source, and the page fetches the payload only when its stored copy
+    # cannot be brought up to date
+    urls = {"data": places_asset(registry)}
+    files = {urls["data"]: registry.client_json}
+    for key, name, ext, content in (
+        ("css", "navigator", "css", minify_css(css)),
+        ("script", "navigator", "js", script),
+        ("worker", "engine", "js", minify_js(engine)),
+    ):
+        urls[key] = _asset(name, ext, content)
+        files[urls[key]] = content
+    files["index.html"] = STUB.format(version=registry.version, **urls)
+    return files
+
+
+def build_shell(registry: LocationRegistry, build_dir: Path = BUILD_DIR) -> Path:
+    """Write the compiled page for this registry version and return its directory.
+
+    Builds are named after the registry version and the page source. The
+    page is written to a temporary directory and renamed into place, so
+    concurrent server processes never serve a partial file.
+    """
+    source_hash = hashlib.sha256(SHELL_PATH.read_bytes()).hexdigest()[:8]
+    directory = build_dir / f"{registry.version}-{source_hash}"
+    if (directory / "index.html").is_file():
+        return directory
+
+    build_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".build-", dir=build_dir))
+    try:
+        for name, content in compile_shell(registry).items():
+            path = staging / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content, encoding="utf-8")
+        try:
+            staging.rename(directory)
+        except OSError:
+            pass  # Another process published the same build first
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    _prune(build_dir, keep=directory)
+    return directory
+
+
+def _prune(build_dir: Path, keep: Path) -> None:
+    builds = sorted(
+        (d for d in build_dir.iterdir() if d.is_dir() and not d.name.startswith(".") and d != keep),
+        key=lambda d: d.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in builds[KEEP_BUILDS - 1 :]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+class ImmutableAssetsMiddleware:
+    """ASGI middleware marking the navigator's hashed assets as immutable.
+
+    Streamlit serves component files with ``Cache-Control: public``, which
+    still has browsers revalidate them; a hashed name never changes content.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not _ASSET_URL.search(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_immutable(message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [(k, v) for k, v in message["headers"] if k.lower() != b"cache-control"]
+                headers.append((b"cache-control", IMMUTABLE.encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_immutable)
+
+
+@st.cache_resource(show_spinner=False, max_entries=KEEP_BUILDS)
+def load_component(registry_version: str, _registry: LocationRegistry):
+    """Declare the navigator component for one registry version.
+
+    ``_registry`` is not hashed; the version identifies it. Its payload is
+    also archived, for deltas to pages that cached it. Declaring a newer
+    version points the component at its build.
+    """
+    load_dataset_archive().add(_registry)
+    return components.declare_component("navigator", path=build_shell(_registry))
+
+
+def navigator(
+    registry: LocationRegistry,
+    travel_mode_pref: str,
+    voice_enabled: bool,
+    voice_rate: float,
+    trending: Iterable[str] = (),
+    key: str = "navigator",
+    on_navigate=None,
+    location_policy: Mapping[str, float] | None = None,
+):
+    """Render the navigator and return its latest navigation event, if any.
+
+    ``trending`` lists place ids shown in a "Trending" section above the
+    list. ``on_navigate`` is called before the rerun that follows a
+    navigation, with the event in ``st.session_state[key]``.
+    ``location_policy`` overrides entries of ``LOCATION_POLICY``.
+    """
+    component = load_component(registry.version, registry)
+    return component(
+        travel_mode=travel_mode_pref,
+        voice_enabled=bool(voice_enabled),
+        voice_rate=float(voice_rate),
+        trending=list(trending),
+        location_policy={**LOCATION_POLICY, **(location_policy or {})},
+        dataset={"version": registry.version, "places": places_asset(registry)},
+        key=key,
+        default=None,
+        on_change=on_navigate,
+    )
@@ -0,0 +1,222 @@
+"""Grid spatial index over the location registry.
+
+Places are bucketed into square cells of ``cell_m`` metres on a local
+equirectangular projection. A nearest-neighbour query visits rings of cells
+around the query point and stops as soon as no unvisited cell can hold a
+closer place, so the cost depends on local density rather than on the size
+of the registry. Every category and every kind of place also gets its own
+grid, which keeps "nearest ATM" (``kind="atm"``) fast even when ATMs are
+rare. A registry change re-buckets only the places that moved.
+"""
+
+import heapq
+import math
+import threading
+from collections import defaultdict
+from typing import Iterable
+
+import streamlit as st
+
+from navigator.geo import METERS_PER_DEGREE, haversine_km
+from navigator.registry import LocationRegistry, Place, RegistryChanges, load_registry_watcher
+
+Cell = tuple[int, int]
+# None for the grid of all places, else ("category", name) or ("kind", kind)
+GridKey = tuple[str, str] | None
+
+
+class SpatialIndex:
+    """Nearest-place queries over a set of places."""
+
+    def __init__(self, places: Iterable[Place], cell_m: float = 50.0, ref_lat: float | None = None) -> None:
+        places = list(places)
+        if ref_lat is None:
+            ref_lat = sum(p.lat for p in places) / len(places) if places else 0.0
+        self.cell_m = cell_m
+        self._ref_cos = max(math.cos(math.radians(ref_lat)), 1e-6)
+        self._deg_lat = cell_m / METERS_PER_DEGREE
+        self._deg_lng = cell_m / (METERS_PER_DEGREE * self._ref_cos)
+
+        self._places: dict[str, Place] = {}
+        self._grids: dict[GridKey, dict[Cell, list[Place]]] = defaultdict(lambda: defaultdict(list))
+        self._bounds: dict[GridKey, list[int]] = {}
+        self._lock = threading.Lock()
+        for place in places:
+            self.add(place)
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def cell_of(self, lat: float, lng: float) -> Cell:
+        """Return the grid cell that contains a point."""
+        return math.floor(lng / self._deg_lng), math.floor(lat / self._deg_lat)
+
+    def add(self, place: Place) -> None:
+        """Insert a place, replacing any previous entry with the same id."""
+        if place.id in self._places:
+            self.remove(place.id)
+        self._places[place.id] = place
+        cell = self.cell_of(place.lat, place.lng)
+        for key in _grid_keys(place):
+            self._grids[key][cell].append(place)
+            bounds = self._bounds.get(key)
+            if bounds is None:
+                self._bounds[key] = [cell[0], cell[1], cell[0], cell[1]]
+            else:
+                bounds[0] = min(bounds[0], cell[0])
+                bounds[1] = min(bounds[1], cell[1])
+                bounds[2] = max(bounds[2], cell[0])
+                bounds[3] = max(bounds[3], cell[1])
+
+    def remove(self, place_id: str) -> Place | None:
+        """Remove a place by id and return it, or ``None`` if it was not indexed."""
+        place = self._places.pop(place_id, None)
+        if place is None:
+            return None
+        cell = self.cell_of(place.lat, place.lng)
+        for key in _grid_keys(place):
+            bucket = self._grids[key][cell]
+            bucket[:] = [p for p in bucket if p.id != place_id]
+            if not bucket:
+                del self._grids[key][cell]
+        return place
+
+    def apply_changes(self, changes: RegistryChanges, registry: LocationRegistry) -> None:
+        """Follow a registry change; places that did not move keep their cells.
+
+        Places are compared with the indexed records rather than trusted to
+        be as ``changes`` describes, so a change applied before, as when a
+        failed reload is retried, is applied again without error.
+        """
+        with self._lock:
+            for place in changes.removed:
+                self.remove(place.id)
+            for place in changes.upserted:
+                indexed = self._places.get(place.id)
+                if indexed is None or _location(indexed) != _location(place):
+                    self.add(place)
+                else:
+                    self._replace(place)
+
+    def _replace(self, place: Place) -> None:
+        # Same id, cell, category and kind: swap the record in its buckets
+        self._places[place.id] = place
+        cell = self.cell_of(place.lat, place.lng)
+        for key in _grid_keys(place):
+            bucket = self._grids[key][cell]
+            bucket[:] = [place if p.id == place.id else p for p in bucket]
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        n: int = 1,
+        category: str | None = None,
+        max_km: float | None = None,
+        kind: str | None = None,
+    ) -> list[tuple[Place, float]]:
+        """Return up to ``n`` places closest to a point as ``(place, km)`` pairs.
+
+        ``category`` restricts the search to one category, ``kind`` to one
+        kind of place, and ``max_km`` drops anything farther away. Results are
+        sorted by distance.
+        """
+        if category is not None and kind is not None:
+            raise ValueError("Pass category or kind, not both")
+        key: GridKey = None
+        if category is not None:
+            key = ("category", category)
+        elif kind is not None:
+            key = ("kind", kind)
+        with self._lock:
+            return self._nearest(lat, lng, n, key, max_km)
+
+    def _nearest(
+        self, lat: float, lng: float, n: int, key: GridKey, max_km: float | None
+    ) -> list[tuple[Place, float]]:
+        grid = self._grids.get(key)
+        if not grid or n <= 0:
+            return []
+
+        cx, cy = self.cell_of(lat, lng)
+        bounds = self._bounds[key]
+        min_x, min_y, max_x, max_y = bounds
+        # Rings closer than the occupied bounding box are empty, farther ones too
+        gap_x = max(0, min_x - cx, cx - max_x)
+        gap_y = max(0, min_y - cy, cy - max_y)
+        first_ring = max(gap_x, gap_y)
+        # Off to the side of the box, every later cell is also offset on the other axis
+        side_gap = max(0, min(gap_x, gap_y) - 1)
+        last_ring = max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+        # Cells are narrower than cell_m east-west poleward of the reference latitude
+        cell_km = self.cell_m / 1000.0 * min(1.0, math.cos(math.radians(lat)) / self._ref_cos)
+
+        best: list[tuple[float, str, Place]] = []  # max-heap of the n closest via negated km
+        for ring in range(first_ring, last_ring + 1):
+            for cell in _ring_cells(cx, cy, ring, bounds):
+                for place in grid.get(cell, ()):
+                    km = haversine_km(lat, lng, place.lat, place.lng)
+                    if max_km is not None and km > max_km:
+                        continue
+                    entry = (-km, place.id, place)
+                    if len(best) < n:
+                        heapq.heappush(best, entry)
+                    elif km < -best[0][0]:
+                        heapq.heapreplace(best, entry)
+            # Any cell in a later ring is at least ``ring`` whole cells away; the
+            # 1% slack covers the projection error against haversine off campus
+            reach_km = math.hypot(ring, side_gap) * cell_km * 0.99
+            if len(best) == n and -best[0][0] <= reach_km:
+                break
+            if max_km is not None and reach_km > max_km:
+                break
+
+        return [(place, -neg_km) for neg_km, _, place in sorted(best, reverse=True)]
+
+    def nearest_in_category(self, lat: float, lng: float, category: str) -> tuple[Place, float] | None:
+        """Return the closest place of one category, e.g. ``"Sports & Recreation"``."""
+        found = self.nearest(lat, lng, n=1, category=category)
+        return found[0] if found else None
+
+    def nearest_of_kind(self, lat: float, lng: float, kind: str) -> tuple[Place, float] | None:
+        """Return the closest place of one kind, e.g. the nearest ATM with ``"atm"``."""
+        found = self.nearest(lat, lng, n=1, kind=kind)
+        return found[0] if found else None
+
+
+def _kind(place: Place) -> str:
+    # The router indexes its graph nodes too, which have no kind
+    return getattr(place, "kind", "")
+
+
+def _location(place: Place) -> tuple[float, float, str, str]:
+    return place.lat, place.lng, place.category, _kind(place)
+
+
+def _grid_keys(place: Place) -> tuple[GridKey, ...]:
+    keys = (None, ("category", place.category))
+    return keys + (("kind", _kind(place)),) if _kind(place) else keys
+
+
+def _ring_cells(cx: int, cy: int, ring: int, bounds: list[int]) -> Iterable[Cell]:
+    """Yield the cells at Chebyshev distance ``ring`` from ``(cx, cy)`` inside ``bounds``."""
+    min_x, min_y, max_x, max_y = bounds
+    if ring == 0:
+        yield cx, cy
+        return
+    x_lo, x_hi = max(cx - ring, min_x), min(cx + ring, max_x)
+    for y in (cy - ring, cy + ring):
+        if min_y <= y <= max_y:
+            for x in range(x_lo, x_hi + 1):
+                yield x, y
+    y_lo, y_hi = max(cy - ring + 1, min_y), min(cy + ring - 1, max_y)
+    for x in (cx - ring, cx + ring):
+        if min_x <= x <= max_x:
+            for y in range(y_lo, y_hi + 1):
+                yield x, y
+
+
+@st.cache_resource(show_spinner=False)
+def load_spatial_index() -> SpatialIndex:
+    """Return the process-wide spatial index, kept in step with the registry."""
+    return load_registry_watcher().subscribe(SpatialIndex)
@@ -0,0 +1,150 @@
+"""Popular destinations across every session.
+
+Navigation events from all sessions feed one process-wide aggregator. Counts
+decay exponentially with a configurable half-life, so "trending" follows what
+people are visiting now rather than all-time totals.
+
+Counts live in a count-min sketch of fixed size, whatever the number of
+distinct places, and the heaviest places are tracked in a bounded top-K
+table. Decay uses forward decay: an event at time ``t`` is added with weight
+``2 ** ((t - t0) / half_life)`` and every count is scaled down by the same
+factor when read. Ranking is unaffected by the common factor, so nothing has
+to be decayed per event. Every recorded event costs ``depth`` counter updates
+plus at most a scan of the ``k`` tracked entries.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from array import array
+from typing import NamedTuple
+
+import streamlit as st
+
+HALF_LIFE_S = 15 * 60.0
+SKETCH_WIDTH = 1024
+SKETCH_DEPTH = 4
+TOP_K = 16
+
+# Seconds a ``top`` result is reused, so concurrent reruns share one snapshot
+SNAPSHOT_TTL = 10.0
+# Decayed visits a place needs before it is shown as trending
+MIN_SCORE = 3.0
+
+# Rescale once forward-decay weights reach 2 ** 40, far from float overflow
+_RESCALE_EXPONENT = 40.0
+
+
+class Trend(NamedTuple):
+    """A trending place and its decayed visit count."""
+
+    place_id: str
+    score: float
+
+
+class TrendingAggregator:
+    """Thread-safe time-decayed heavy hitters over place ids."""
+
+    def __init__(
+        self,
+        half_life_s: float = HALF_LIFE_S,
+        width: int = SKETCH_WIDTH,
+        depth: int = SKETCH_DEPTH,
+        k: int = TOP_K,
+        now: float | None = None,
+    ) -> None:
+        if half_life_s <= 0 or width < 1 or not 1 <= depth <= 8 or k < 1:
+            raise ValueError("invalid sketch parameters")
+        self.half_life_s = half_life_s
+        self.width = width
+        self.depth = depth
+        self.k = k
+        self._rows = [array("d", bytes(8 * width)) for _ in range(depth)]
+        # Tracked heavy hitters, in the same forward-decayed units as the sketch
+        self._top: dict[str, float] = {}
+        self._total = 0.0
+        self._t0 = time.time() if now is None else now
+        self._lock = threading.Lock()
+        self._snapshot: tuple[float, tuple, list[Trend]] | None = None
+
+    def _buckets(self, place_id: str) -> list[int]:
+        digest = hashlib.blake2b(place_id.encode("utf-8"), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[8 * i : 8 * i + 8], "little") % self.width for i in range(self.depth)]
+
+    def _exponent(self, now: float) -> float:
+        return (now - self._t0) / self.half_life_s
+
+    def _rescale(self, now: float) -> None:
+        factor = 2.0 ** -self._exponent(now)
+        for row in self._rows:
+            for i, value in enumerate(row):
+                if value:
+                    row[i] = value * factor
+        for place_id in self._top:
+            self._top[place_id] *= factor
+        self._total *= factor
+        self._t0 = now
+
+    def record(self, place_id: str, now: float | None = None, weight: float = 1.0) -> None:
+        """Count one visit to ``place_id``."""
+        now = time.time() if now is None else now
+        buckets = self._buckets(place_id)
+        with self._lock:
+            if self._exponent(now) > _RESCALE_EXPONENT:
+                self._rescale(now)
+            increment = weight * 2.0 ** self._exponent(now)
+            estimate = math.inf
+            for row, bucket in zip(self._rows, buckets):
+                row[bucket] += increment
+                estimate = min(estimate, row[bucket])
+            self._total += increment
+
+            top = self._top
+            if place_id in top or len(top) < self.k:
+                top[place_id] = estimate
+            else:
+                weakest = min(top, key=top.__getitem__)
+                if estimate > top[weakest]:
+                    del top[weakest]
+                    top[place_id] = estimate
+
+    def estimate(self, place_id: str, now: float | None = None) -> float:
+        """Decayed visit count of one place; never below the true count."""
+        now = time.time() if now is None else now
+        buckets = self._buckets(place_id)
+        with self._lock:
+            raw = min(row[bucket] for row, bucket in zip(self._rows, buckets))
+            return raw * 2.0 ** -self._exponent(now)
+
+    def total(self, now: float | None = None) -> float:
+        """Decayed count of all visits."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._total * 2.0 ** -self._exponent(now)
+
+    def top(self, n: int = 5, min_score: float = 0.0, now: float | None = None) -> list[Trend]:
+        """Up to ``n`` heaviest places scoring at least ``min_score``, heaviest first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            factor = 2.0 ** -self._exponent(now)
+            ranked = sorted(self._top.items(), key=lambda entry: (-entry[1], entry[0]))
+        trends = [Trend(place_id, score * factor) for place_id, score in ranked[:n]]
+        return [trend for trend in trends if trend.score >= min_score]
+
+    def snapshot(self, n: int = 5, min_score: float = MIN_SCORE, ttl: float = SNAPSHOT_TTL) -> list[Trend]:
+        """``top`` result shared for ``ttl`` seconds across callers."""
+        now = time.monotonic()
+        key = (n, min_score)
+        cached = self._snapshot
+        if cached is not None and cached[1] == key and now - cached[0] < ttl:
+            return cached[2]
+        trends = self.top(n, min_score)
+        self._snapshot = (now, key, trends)
+        return trends
+
+
+@st.cache_resource(show_spinner=False)
+def load_trending() -> TrendingAggregator:
+    """Return the process-wide trending aggregator."""
+    return TrendingAggregator()
@@ -0,0 +1,22 @@
+"""ASGI entry point: the Streamlit app plus the navigator JSON API.
+
+Run with ``uvicorn serve:app --host 0.0.0.0 --port 8501``. ``streamlit run
+app.py`` still works, without the ``/navigator/api`` routes and with the
+navigator's hashed assets revalidated instead of cached as immutable, and
+navigation history kept for a session only. Under uvicorn the router and
+indexes are built before the first request is served.
+"""
+
+import streamlit as st
+from starlette.middleware import Middleware
+
+from navigator import api
+from navigator.history import SessionCookieMiddleware
+from navigator.shell import ImmutableAssetsMiddleware
+
+app = st.App(
+    "app.py",
+    lifespan=api.lifespan,
+    routes=api.routes(),
+    middleware=[Middleware(SessionCookieMiddleware), Middleware(ImmutableAssetsMiddleware)],
+)